@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react'
-import api from '../services/api'
+import api, { getAllPages } from '../services/api'
 
 export default function TimeEntries() {
   const [entries, setEntries] = useState([])
@@ -27,14 +27,14 @@ export default function TimeEntries() {
   const fetchData = async () => {
     try {
       setLoading(true)
-      const [entriesRes, employeesRes, projectsRes] = await Promise.all([
-        api.get(`/time-entries?month=${selectedMonth}`),
-        api.get('/employees'),
-        api.get('/projects')
+      const [entriesData, employeesData, projectsData] = await Promise.all([
+        getAllPages('/time-entries', { month: selectedMonth }),
+        getAllPages('/employees'),
+        getAllPages('/projects')
       ])
-      setEntries(entriesRes.data)
-      setEmployees(employeesRes.data)
-      setProjects(projectsRes.data)
+      setEntries(entriesData)
+      setEmployees(employeesData)
+      setProjects(projectsData)
     } catch (error) {
       console.error('Error fetching data:', error)
     } finally {
@@ -0,0 +1,4 @@
+import time
+
+# When the app package started importing; cold-start times are measured from here
+IMPORT_STARTED = time.perf_counter()
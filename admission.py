@@ -0,0 +1,111 @@
+from contextlib import asynccontextmanager
+from typing import Dict
+import asyncio
+import math
+import os
+import weakref
+
+# Report and export computations running at once per worker (0 disables the
+# limit). Keep it below DB_POOL_SIZE so time-entry writes always find a
+# connection when reports share the sync pool (USE_ASYNC_DB=false).
+REPORT_CONCURRENCY = int(os.getenv("REPORT_CONCURRENCY", "4"))
+# Computations allowed to wait for a slot; beyond that they get a 503 at once
+REPORT_QUEUE_SIZE = int(os.getenv("REPORT_QUEUE_SIZE", "32"))
+REPORT_QUEUE_TIMEOUT_SECONDS = float(os.getenv("REPORT_QUEUE_TIMEOUT_SECONDS", "10"))
+REPORT_RETRY_AFTER_SECONDS = max(1, math.ceil(REPORT_QUEUE_TIMEOUT_SECONDS))
+
+class AdmissionRejected(Exception):
+    """The queue was full, or no slot became free within the queue timeout"""
+
+    def __init__(self, limiter: "AdmissionLimiter"):
+        self.retry_after = limiter.retry_after
+        super().__init__(f"{limiter.name}: no free slot")
+
+class _LoopState:
+    def __init__(self, concurrency: int):
+        self.slots = asyncio.Semaphore(concurrency)
+        self.running = 0
+        self.waiting = 0
+
+class AdmissionLimiter:
+    """Bounds how many expensive operations run at once, with a bounded queue.
+
+    An operation runs when one of concurrency slots is free, otherwise it
+    waits behind at most queue_size others for up to timeout seconds;
+    AdmissionRejected is raised when the queue is full or the wait times out.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, timeout: float, retry_after: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.rejected = 0
+        # One state per event loop; asyncio primitives must not cross loops
+        self._states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            state = self._states[loop] = _LoopState(self.concurrency)
+        return state
+
+    def _reject(self) -> AdmissionRejected:
+        self.rejected += 1
+        return AdmissionRejected(self)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.concurrency <= 0:
+            yield
+            return
+
+        state = self._state()
+        if state.slots.locked() and state.waiting >= self.queue_size:
+            raise self._reject()
+        state.waiting += 1
+        try:
+            await asyncio.wait_for(state.slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise self._reject()
+        finally:
+            state.waiting -= 1
+
+        state.running += 1
+        try:
+            yield
+        finally:
+            state.running -= 1
+            state.slots.release()
+
+    async def run(self, fn, *args):
+        """await fn(*args) once a slot is free"""
+        async with self.slot():
+            return await fn(*args)
+
+    def stats(self) -> Dict[str, int]:
+        states = list(self._states.values())
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "running": sum(state.running for state in states),
+            "waiting": sum(state.waiting for state in states),
+            "rejected": self.rejected,
+        }
+
+report_admission = AdmissionLimiter(
+    "reports",
+    REPORT_CONCURRENCY,
+    REPORT_QUEUE_SIZE,
+    REPORT_QUEUE_TIMEOUT_SECONDS,
+    REPORT_RETRY_AFTER_SECONDS
+)
+
+async def report_slot():
+    """Dependency holding a report slot for the whole request, streaming included"""
+    async with report_admission.slot():
+        yield
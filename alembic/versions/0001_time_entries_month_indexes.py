@@ -0,0 +1,47 @@
+"""composite time_entries indexes for month-range report queries
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # CONCURRENTLY avoids locking time_entries writes on PostgreSQL and has to
+    # run outside of a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_time_entries_project_date",
+            "time_entries",
+            ["project_id", "entry_date"],
+            postgresql_include=["employee_id", "hours"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "idx_time_entries_employee_date",
+            "time_entries",
+            ["employee_id", "entry_date"],
+            postgresql_include=["project_id", "hours"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "idx_time_entries_employee_date",
+            table_name="time_entries",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "idx_time_entries_project_date",
+            table_name="time_entries",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,72 @@
+"""monthly_rollups table with hours and cost per employee, project and month
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    rollups = op.create_table(
+        "monthly_rollups",
+        sa.Column("employee_id", sa.Integer(), sa.ForeignKey("employees.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("month", sa.Date(), nullable=False),
+        sa.Column("hours", sa.Numeric(12, 2), nullable=False, server_default="0"),
+        sa.Column("cost", sa.Numeric(14, 2), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("employee_id", "project_id", "month"),
+    )
+    op.create_index("idx_monthly_rollups_month", "monthly_rollups", ["month"])
+
+    # Backfill from the existing time entries. The tables are described here
+    # as they are at this revision, never imported from the app's models
+    time_entries = sa.table(
+        "time_entries",
+        sa.column("employee_id", sa.Integer()),
+        sa.column("project_id", sa.Integer()),
+        sa.column("entry_date", sa.Date()),
+        sa.column("hours", sa.Numeric(5, 2)),
+    )
+    employees = sa.table(
+        "employees",
+        sa.column("id", sa.Integer()),
+        sa.column("monthly_cost", sa.Numeric(12, 2)),
+        sa.column("hours_per_month", sa.Integer()),
+    )
+    if op.get_bind().dialect.name == "postgresql":
+        month = sa.cast(sa.func.date_trunc("month", time_entries.c.entry_date), sa.Date())
+    else:
+        month = sa.func.date(time_entries.c.entry_date, "start of month")
+    hours = sa.func.sum(time_entries.c.hours)
+    hourly_cost = employees.c.monthly_cost / sa.func.nullif(employees.c.hours_per_month, 0)
+    backfill = (
+        sa.select(
+            time_entries.c.employee_id,
+            time_entries.c.project_id,
+            month,
+            hours,
+            sa.func.coalesce(sa.func.round(hours * hourly_cost, 2), 0),
+        )
+        .select_from(time_entries.join(employees, employees.c.id == time_entries.c.employee_id))
+        .group_by(
+            time_entries.c.employee_id,
+            time_entries.c.project_id,
+            month,
+            employees.c.monthly_cost,
+            employees.c.hours_per_month,
+        )
+    )
+    op.execute(
+        rollups.insert().from_select(["employee_id", "project_id", "month", "hours", "cost"], backfill)
+    )
+
+def downgrade() -> None:
+    op.drop_index("idx_monthly_rollups_month", table_name="monthly_rollups")
+    op.drop_table("monthly_rollups")
@@ -0,0 +1,29 @@
+"""month_snapshots table with the frozen reports of closed months
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "month_snapshots",
+        sa.Column("month", sa.Date(), primary_key=True),
+        sa.Column("closed_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        sa.Column("closed_by", sa.Integer(), sa.ForeignKey("users.id", ondelete="SET NULL")),
+        sa.Column("summary", sa.JSON(), nullable=False),
+        sa.Column("projects", sa.JSON(), nullable=False),
+        sa.Column("employees", sa.JSON(), nullable=False),
+        sa.Column("cost_rates", sa.JSON(), nullable=False),
+    )
+
+def downgrade() -> None:
+    op.drop_table("month_snapshots")
@@ -0,0 +1,45 @@
+"""updated_at on the synced tables and the tombstones table for /sync
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+SYNCED_TABLES = ("employees", "projects", "time_entries")
+
+def upgrade() -> None:
+    # SQLite cannot ALTER TABLE ADD COLUMN with a non-constant default, so
+    # there the tables are rebuilt; existing rows get the migration time
+    recreate = "always" if op.get_bind().dialect.name == "sqlite" else "auto"
+    for table in SYNCED_TABLES:
+        with op.batch_alter_table(table, recreate=recreate) as batch:
+            batch.add_column(
+                sa.Column("updated_at", sa.TIMESTAMP(), nullable=False, server_default=sa.func.now())
+            )
+        op.create_index(f"idx_{table}_updated_at", table, ["updated_at"])
+
+    op.create_table(
+        "tombstones",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("table_name", sa.String(), nullable=False),
+        sa.Column("row_id", sa.Integer(), nullable=False),
+        sa.Column("deleted_at", sa.TIMESTAMP(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("idx_tombstones_deleted_at", "tombstones", ["deleted_at"])
+
+def downgrade() -> None:
+    op.drop_index("idx_tombstones_deleted_at", table_name="tombstones")
+    op.drop_table("tombstones")
+    recreate = "always" if op.get_bind().dialect.name == "sqlite" else "auto"
+    for table in SYNCED_TABLES:
+        op.drop_index(f"idx_{table}_updated_at", table_name=table)
+        with op.batch_alter_table(table, recreate=recreate) as batch:
+            batch.drop_column("updated_at")
@@ -0,0 +1,44 @@
+"""drop monthly_rollups.cost: reports price the hours with the current rates
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    with op.batch_alter_table("monthly_rollups") as batch:
+        batch.drop_column("cost")
+
+def downgrade() -> None:
+    with op.batch_alter_table("monthly_rollups") as batch:
+        batch.add_column(sa.Column("cost", sa.Numeric(14, 2), nullable=False, server_default="0"))
+
+    # Refilled with the current rates, as app.rollups rebuild did at 0006
+    rollups = sa.table(
+        "monthly_rollups",
+        sa.column("employee_id", sa.Integer()),
+        sa.column("hours", sa.Numeric(12, 2)),
+        sa.column("cost", sa.Numeric(14, 2)),
+    )
+    employees = sa.table(
+        "employees",
+        sa.column("id", sa.Integer()),
+        sa.column("monthly_cost", sa.Numeric(12, 2)),
+        sa.column("hours_per_month", sa.Integer()),
+    )
+    hourly_cost = (
+        sa.select(employees.c.monthly_cost / sa.func.nullif(employees.c.hours_per_month, 0))
+        .where(employees.c.id == rollups.c.employee_id)
+        .scalar_subquery()
+    )
+    op.execute(
+        rollups.update().values(cost=sa.func.coalesce(sa.func.round(rollups.c.hours * hourly_cost, 2), 0))
+    )
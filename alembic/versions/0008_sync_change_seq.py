@@ -0,0 +1,39 @@
+"""change_seq on the synced tables and tombstones: /sync tracks commit order, not updated_at
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+SYNCED_TABLES = ("employees", "projects", "time_entries")
+
+def upgrade() -> None:
+    # Existing rows get 0; tokens issued before this migration get a reset
+    for table in SYNCED_TABLES:
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column("change_seq", sa.BigInteger(), nullable=False, server_default="0"))
+        op.drop_index(f"idx_{table}_updated_at", table_name=table)
+        op.create_index(f"idx_{table}_change_seq", table, ["change_seq"])
+
+    with op.batch_alter_table("tombstones") as batch:
+        batch.add_column(sa.Column("change_seq", sa.BigInteger(), nullable=False, server_default="0"))
+    op.create_index("idx_tombstones_change_seq", "tombstones", ["table_name", "change_seq"])
+
+def downgrade() -> None:
+    op.drop_index("idx_tombstones_change_seq", table_name="tombstones")
+    with op.batch_alter_table("tombstones") as batch:
+        batch.drop_column("change_seq")
+
+    for table in SYNCED_TABLES:
+        op.drop_index(f"idx_{table}_change_seq", table_name=table)
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("change_seq")
+        op.create_index(f"idx_{table}_updated_at", table, ["updated_at"])
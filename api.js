@@ -13,5 +13,19 @@ if (token) {
   api.defaults.headers.common['Authorization'] = `Bearer ${token}`
 }
 
+// Fetch every page of a cursor-paginated list endpoint
+export const getAllPages = async (url, params = {}) => {
+  const items = []
+  let cursor = null
+  do {
+    const res = await api.get(url, {
+      params: { ...params, limit: 1000, ...(cursor ? { cursor } : {}) },
+    })
+    items.push(...res.data)
+    cursor = res.headers['x-next-cursor']
+  } while (cursor)
+  return items
+}
+
 export default api
 
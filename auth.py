@@ -1,27 +1,153 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+import asyncio
+import math
+import threading
+import time
+import weakref
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import SessionLocal, close_session, open_read_session
 from app import models
 import os
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "1024"))
+AUTH_USER_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "60"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", "4"))
+PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS", "5"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = max(1, math.ceil(PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+@dataclass(frozen=True)
+class CurrentUser:
+    """Authenticated user as seen by the endpoints; safe to cache across sessions"""
+    id: int
+    email: str
+    role: str
+    token_version: int
+
+    @classmethod
+    def from_model(cls, user: models.User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            role=user.role,
+            token_version=user.token_version or 0
+        )
+
+class UserCache:
+    """Small LRU cache of CurrentUser by id whose entries expire after ttl seconds.
+
+    Every worker has its own cache, so a change made elsewhere (a revoked token,
+    a new role) is seen here at most ttl seconds later.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[CurrentUser]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user
+
+    def set(self, user: CurrentUser) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+user_cache = UserCache(AUTH_USER_CACHE_SIZE, AUTH_USER_CACHE_TTL_SECONDS)
+
+def invalidate_cached_user(user_id: int) -> None:
+    """Call after changing a user's email, role or token version"""
+    user_cache.invalidate(user_id)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def verify_and_rehash_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and, if its hash uses outdated settings, return a new hash"""
+    if not pwd_context.verify(plain_password, hashed_password):
+        return False, None
+    if pwd_context.needs_update(hashed_password):
+        return True, pwd_context.hash(plain_password)
+    return True, None
+
+class PasswordHashingBusy(Exception):
+    """No password hashing slot became free within the queue timeout"""
+
+# bcrypt gets its own bounded pool so a burst of logins cannot take over the
+# threadpool that serves every other sync endpoint
+_password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_CONCURRENCY,
+    thread_name_prefix="password-hash"
+)
+_password_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+def _get_password_slots() -> asyncio.Semaphore:
+    # One semaphore per event loop; asyncio primitives must not cross loops
+    loop = asyncio.get_running_loop()
+    slots = _password_slots.get(loop)
+    if slots is None:
+        slots = _password_slots[loop] = asyncio.Semaphore(PASSWORD_HASH_CONCURRENCY)
+    return slots
+
+async def run_password_job(func, *args):
+    """Run a bcrypt operation on the password executor.
+
+    Waits at most PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS for a free slot and
+    raises PasswordHashingBusy otherwise.
+    """
+    slots = _get_password_slots()
+    try:
+        await asyncio.wait_for(slots.acquire(), PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise PasswordHashingBusy()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, func, *args)
+    finally:
+        slots.release()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -32,15 +158,60 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = db.query(models.User).filter(models.User.email == email).first()
+def create_user_access_token(user: models.User) -> str:
+    """Access token carrying the claims get_current_user needs (id, role, token version)"""
+    return create_access_token(data={
+        "sub": user.email,
+        "uid": user.id,
+        "role": user.role,
+        "ver": user.token_version or 0
+    })
+
+def revoke_user_tokens(db: Session, user: models.User) -> None:
+    """Invalidate every token issued to a user so far"""
+    user.token_version = (user.token_version or 0) + 1
+    db.commit()
+    invalidate_cached_user(user.id)
+
+def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
+    return db.query(models.User).filter(models.User.email == email).first()
+
+def _update_password_hash(db: Session, user: models.User, password_hash: str) -> None:
+    user.password_hash = password_hash
+    db.commit()
+
+async def authenticate_user_async(db: Session, email: str, password: str):
+    """The user with email and password, or False. bcrypt runs on the password
+    executor, database access on the threadpool. Upgrades outdated hashes on success."""
+    user = await run_in_threadpool(get_user_by_email, db, email)
     if not user:
         return False
-    if not verify_password(password, user.password_hash):
+    valid, new_hash = await run_password_job(verify_and_rehash_password, password, user.password_hash)
+    if not valid:
         return False
+    if new_hash:
+        await run_in_threadpool(_update_password_hash, db, user, new_hash)
     return user
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def _load_current_user(user_id: int) -> Optional[CurrentUser]:
+    db = SessionLocal()
+    try:
+        db_user = db.query(models.User).filter(models.User.id == user_id).first()
+        return CurrentUser.from_model(db_user) if db_user else None
+    finally:
+        db.close()
+
+def _load_current_user_by_email(email: str) -> Optional[CurrentUser]:
+    db = SessionLocal()
+    try:
+        db_user = get_user_by_email(db, email)
+        return CurrentUser.from_model(db_user) if db_user else None
+    finally:
+        db.close()
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> CurrentUser:
+    # Async and without a session dependency: on a cache hit authentication
+    # touches neither the database nor the threadpool
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -53,12 +224,30 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(models.User).filter(models.User.email == email).first()
+    
+    user_id = payload.get("uid")
+    if user_id is None:
+        # Tokens issued before the id/role claims existed
+        user = await run_in_threadpool(_load_current_user_by_email, email)
+        if user is None:
+            raise credentials_exception
+        return user
+    
+    user = user_cache.get(user_id)
     if user is None:
+        user = await run_in_threadpool(_load_current_user, user_id)
+        if user is not None:
+            user_cache.set(user)
+    if (
+        user is None
+        or user.email != email
+        or user.role != payload.get("role")
+        or user.token_version != payload.get("ver")
+    ):
         raise credentials_exception
     return user
 
-def get_current_admin_user(current_user: models.User = Depends(get_current_user)):
+async def get_current_admin_user(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -66,3 +255,21 @@ def get_current_admin_user(current_user: models.User = Depends(get_current_user)
         )
     return current_user
 
+
+def get_user_db(current_user: CurrentUser = Depends(get_current_user)):
+    """Primary session for a user's writes; committing it pins their reads to
+    the primary for the read-your-writes window"""
+    db = SessionLocal()
+    db.info["user_id"] = current_user.id
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_user_read_db(current_user: CurrentUser = Depends(get_current_user)):
+    """Read-only session for the current user, on a replica unless they wrote recently"""
+    db = open_read_session(current_user.id)
+    try:
+        yield db
+    finally:
+        await close_session(db)
@@ -0,0 +1,103 @@
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, List, Set, Tuple
+import csv
+import io
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app import models, schemas
+from app.month_close import closed_months, lock_months
+from app.rollups import RollupKey, add_rollup_hours, month_start
+from app.sync import record_change
+
+# Rows sent to the database per executemany
+BULK_INSERT_CHUNK_SIZE = 1000
+
+TIME_ENTRY_CSV_FIELDS = ["employee_id", "project_id", "entry_date", "hours", "note"]
+
+def parse_time_entry_csv(content: bytes) -> List[Dict[str, Any]]:
+    """Rows of an uploaded CSV with a header line naming the time-entry fields"""
+    reader = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+    rows = []
+    for record in reader:
+        row = {field: (record.get(field) or "").strip() for field in TIME_ENTRY_CSV_FIELDS}
+        row["note"] = row["note"] or None
+        rows.append(row)
+    return rows
+
+def _format_validation_error(error: ValidationError) -> str:
+    messages = []
+    for detail in error.errors():
+        location = ".".join(str(part) for part in detail["loc"])
+        messages.append(f"{location}: {detail['msg']}" if location else detail["msg"])
+    return "; ".join(messages)
+
+def _existing_ids(db: Session, model, ids: Set[int]) -> Set[int]:
+    if not ids:
+        return set()
+    return {row_id for (row_id,) in db.query(model.id).filter(model.id.in_(ids))}
+
+def import_time_entries(db: Session, rows: List[Any]) -> dict:
+    """Validate and insert many time entries; does not commit.
+
+    Invalid rows, including those in closed months, are reported by their
+    position in rows and skipped; the rest are inserted in chunks, after
+    app.sync.record_change. The monthly rollups are updated once per
+    (employee, project, month) touched. Returns the result payload.
+    """
+    errors = []
+    valid: List[Tuple[int, schemas.TimeEntryCreate]] = []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, schemas.TimeEntryCreate.model_validate(row)))
+        except ValidationError as error:
+            errors.append({"row": index, "error": _format_validation_error(error)})
+
+    # One lookup per referenced table instead of one per row
+    employee_ids = _existing_ids(db, models.Employee, {entry.employee_id for _, entry in valid})
+    project_ids = _existing_ids(db, models.Project, {entry.project_id for _, entry in valid})
+    days = {entry.entry_date for _, entry in valid}
+    # Locked until the commit so the months cannot be closed meanwhile
+    lock_months(db, days)
+    closed = closed_months(db, days)
+    checked = []
+    for index, entry in valid:
+        if month_start(entry.entry_date) in closed:
+            errors.append({"row": index, "error": f"entry_date: month {entry.entry_date:%Y-%m} is closed"})
+        elif entry.employee_id not in employee_ids:
+            errors.append({"row": index, "error": f"employee_id: employee {entry.employee_id} not found"})
+        elif entry.project_id not in project_ids:
+            errors.append({"row": index, "error": f"project_id: project {entry.project_id} not found"})
+        else:
+            checked.append((index, entry.model_dump()))
+
+    if checked:
+        record_change(db, models.TimeEntry)
+    inserted: List[dict] = []
+    table = models.TimeEntry.__table__
+    for start in range(0, len(checked), BULK_INSERT_CHUNK_SIZE):
+        chunk = checked[start:start + BULK_INSERT_CHUNK_SIZE]
+        try:
+            with db.begin_nested():
+                db.execute(insert(table), [values for _, values in chunk])
+            inserted.extend(values for _, values in chunk)
+        except SQLAlchemyError:
+            # Retry the failed chunk row by row to pin down the offending rows
+            for index, values in chunk:
+                try:
+                    with db.begin_nested():
+                        db.execute(insert(table), [values])
+                    inserted.append(values)
+                except SQLAlchemyError as error:
+                    errors.append({"row": index, "error": str(getattr(error, "orig", None) or error).splitlines()[0]})
+
+    totals: Dict[RollupKey, Decimal] = defaultdict(Decimal)
+    for values in inserted:
+        totals[(values["employee_id"], values["project_id"], month_start(values["entry_date"]))] += values["hours"]
+    for (employee_id, project_id, month_key), hours in totals.items():
+        add_rollup_hours(db, employee_id, project_id, month_key, hours)
+
+    errors.sort(key=lambda error: error["row"])
+    return {"created": len(inserted), "errors": errors}
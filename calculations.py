@@ -1,9 +1,83 @@
 from decimal import Decimal
-from datetime import datetime
+from datetime import datetime, date
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy import func, and_
 from app import models
-from typing import List, Tuple
+from typing import Dict, Optional, Tuple
+
+def get_month_range(year: int, month: int) -> Tuple[date, date]:
+    """Devuelve el primer día del mes y el primer día del mes siguiente"""
+    start = date(year, month, 1)
+    if month == 12:
+        return start, date(year + 1, 1, 1)
+    return start, date(year, month + 1, 1)
+
+def month_filter(year: int, month: int):
+    """Filtro de entradas de un mes como rango de fechas.
+
+    A diferencia de extract('year'/'month', ...), un rango sobre entry_date
+    permite usar los índices de time_entries en lugar de recorrer la tabla.
+    """
+    start, end = get_month_range(year, month)
+    return and_(
+        models.TimeEntry.entry_date >= start,
+        models.TimeEntry.entry_date < end
+    )
+
+class MonthCalculationContext:
+    """Contexto de cálculo de un mes.
+
+    Carga una sola vez los totales de horas por proyecto y memoriza los
+    ingresos, de modo que varios cálculos sobre el mismo mes no repitan
+    consultas. Solo es válido mientras no cambien las entradas del mes.
+    """
+
+    def __init__(self, db: Session, year: int, month: int):
+        self.db = db
+        self.year = year
+        self.month = month
+        self._project_hours: Optional[Dict[int, Decimal]] = None
+        self._project_revenues: Dict[int, Decimal] = {}
+
+    def matches(self, year: int, month: int) -> bool:
+        return self.year == year and self.month == month
+
+    def project_hours(self, project_id: int) -> Decimal:
+        """Horas totales de un proyecto en el mes (una consulta agrupada para todos)"""
+        if self._project_hours is None:
+            rows = self.db.query(
+                models.TimeEntry.project_id,
+                func.sum(models.TimeEntry.hours)
+            ).filter(
+                month_filter(self.year, self.month)
+            ).group_by(models.TimeEntry.project_id).all()
+            self._project_hours = {
+                row_project_id: hours or Decimal(0) for row_project_id, hours in rows
+            }
+        return self._project_hours.get(project_id, Decimal(0))
+
+    def project_revenue(self, project: models.Project) -> Decimal:
+        """Ingresos de un proyecto en el mes: su precio fijo o sus horas por el precio por hora"""
+        if project.price_type == "fixed":
+            return project.price_value
+        if project.id not in self._project_revenues:
+            self._project_revenues[project.id] = self.project_hours(project.id) * project.price_value
+        return self._project_revenues[project.id]
+
+def _resolve_context(
+    db: Session,
+    year: int,
+    month: int,
+    context: Optional[MonthCalculationContext]
+) -> MonthCalculationContext:
+    if context is None:
+        return MonthCalculationContext(db, year, month)
+    if not context.matches(year, month):
+        raise ValueError(
+            f"Calculation context is for {context.year}-{context.month:02d}, "
+            f"not {year}-{month:02d}"
+        )
+    return context
 
 def calculate_hourly_cost(monthly_cost: Decimal, hours_per_month: int) -> Decimal:
     """Calcula el coste por hora de un empleado"""
@@ -11,44 +85,6 @@ def calculate_hourly_cost(monthly_cost: Decimal, hours_per_month: int) -> Decima
         return Decimal(0)
     return monthly_cost / Decimal(hours_per_month)
 
-def get_time_entries_for_month(db: Session, year: int, month: int) -> List[models.TimeEntry]:
-    """Obtiene todas las entradas de tiempo para un mes específico"""
-    return db.query(models.TimeEntry).filter(
-        extract('year', models.TimeEntry.entry_date) == year,
-        extract('month', models.TimeEntry.entry_date) == month
-    ).all()
-
-def calculate_project_costs(db: Session, project_id: int, year: int, month: int) -> Decimal:
-    """Calcula el coste total de un proyecto en un mes"""
-    entries = db.query(models.TimeEntry).join(models.Employee).filter(
-        models.TimeEntry.project_id == project_id,
-        extract('year', models.TimeEntry.entry_date) == year,
-        extract('month', models.TimeEntry.entry_date) == month
-    ).all()
-    
-    total_cost = Decimal(0)
-    for entry in entries:
-        hourly_cost = calculate_hourly_cost(
-            entry.employee.monthly_cost,
-            entry.employee.hours_per_month
-        )
-        total_cost += entry.hours * hourly_cost
-    
-    return total_cost
-
-def calculate_project_revenue(project: models.Project, year: int, month: int, db: Session) -> Decimal:
-    """Calcula los ingresos de un proyecto en un mes"""
-    if project.price_type == "fixed":
-        return project.price_value
-    else:  # hourly
-        # Suma las horas facturables del mes
-        total_hours = db.query(func.sum(models.TimeEntry.hours)).filter(
-            models.TimeEntry.project_id == project.id,
-            extract('year', models.TimeEntry.entry_date) == year,
-            extract('month', models.TimeEntry.entry_date) == month
-        ).scalar() or Decimal(0)
-        return total_hours * project.price_value
-
 def calculate_project_margin(revenue: Decimal, cost: Decimal) -> Decimal:
     """Calcula el margen de un proyecto"""
     return revenue - cost
@@ -69,33 +105,30 @@ def calculate_employee_revenue_attributed(
     db: Session, 
     employee_id: int, 
     year: int, 
-    month: int
+    month: int,
+    context: Optional[MonthCalculationContext] = None
 ) -> Decimal:
     """Calcula los ingresos atribuidos a un empleado en un mes"""
-    # Obtener todas las entradas del empleado en el mes
-    entries = db.query(models.TimeEntry).filter(
+    context = _resolve_context(db, year, month, context)
+
+    # Horas del empleado en el mes agrupadas por proyecto
+    rows = db.query(models.Project, func.sum(models.TimeEntry.hours)).join(
+        models.TimeEntry, models.TimeEntry.project_id == models.Project.id
+    ).filter(
         models.TimeEntry.employee_id == employee_id,
-        extract('year', models.TimeEntry.entry_date) == year,
-        extract('month', models.TimeEntry.entry_date) == month
-    ).all()
+        month_filter(year, month)
+    ).group_by(models.Project.id).all()
     
     total_revenue = Decimal(0)
     
-    for entry in entries:
-        project = entry.project
-        # Calcular ingresos del proyecto en el mes
-        project_revenue = calculate_project_revenue(project, year, month, db)
-        
-        # Calcular total de horas del proyecto en el mes
-        project_total_hours = db.query(func.sum(models.TimeEntry.hours)).filter(
-            models.TimeEntry.project_id == project.id,
-            extract('year', models.TimeEntry.entry_date) == year,
-            extract('month', models.TimeEntry.entry_date) == month
-        ).scalar() or Decimal(0)
+    for project, employee_hours in rows:
+        # Ingresos y horas totales del proyecto en el mes (memorizados en el contexto)
+        project_revenue = context.project_revenue(project)
+        project_total_hours = context.project_hours(project.id)
         
         if project_total_hours > 0:
             # Atribuir ingresos proporcionalmente a las horas del empleado
-            employee_share = entry.hours / project_total_hours
+            employee_share = (employee_hours or Decimal(0)) / project_total_hours
             total_revenue += project_revenue * employee_share
     
     return total_revenue
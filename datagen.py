@@ -0,0 +1,154 @@
+from dataclasses import dataclass, replace
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List, Optional
+import argparse
+import random
+import sys
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+from app import models
+from app.database import Base, SessionLocal
+from app.calculations import get_month_range
+from app.report_cache import report_cache
+from app.rollups import rebuild_rollups
+from app.sync import record_change
+
+# Rows sent to the database per executemany
+INSERT_CHUNK_SIZE = 5000
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """Shape of a synthetic dataset; the same spec and seed always give the same rows"""
+
+    employees: int = 20
+    projects: int = 10
+    entries_per_month: int = 500
+    months: int = 12
+    fixed_ratio: float = 0.3  # share of fixed-price projects
+    last_month: date = date(2024, 12, 1)
+    seed: int = 42
+
+    def month_starts(self) -> List[date]:
+        months = []
+        current = self.last_month.replace(day=1)
+        for _ in range(self.months):
+            months.append(current)
+            current = (current - timedelta(days=1)).replace(day=1)
+        return list(reversed(months))
+
+SCALES = {
+    "small": DatasetSpec(employees=10, projects=5, entries_per_month=200, months=3),
+    "medium": DatasetSpec(employees=50, projects=20, entries_per_month=2000, months=12),
+    "large": DatasetSpec(employees=200, projects=60, entries_per_month=20000, months=24),
+}
+
+def database_is_empty(db: Session) -> bool:
+    """Whether the data tables have no rows; creates any missing table first"""
+    Base.metadata.create_all(bind=db.get_bind())
+    return not any(
+        db.query(func.count()).select_from(model).scalar()
+        for model in (models.Employee, models.Project, models.TimeEntry)
+    )
+
+def reset_database(db: Session) -> None:
+    """Drop and recreate every table of the models. Destroys all data."""
+    bind = db.get_bind()
+    db.close()
+    Base.metadata.drop_all(bind=bind)
+    Base.metadata.create_all(bind=bind)
+
+def _insert_chunked(db: Session, table, rows: List[dict]) -> None:
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        db.execute(insert(table), rows[start:start + INSERT_CHUNK_SIZE])
+
+def generate_dataset(db: Session, spec: DatasetSpec) -> dict:
+    """Insert employees, projects and time entries for spec and rebuild the rollups.
+
+    Works on any backend (plain executemany, ids assigned by the database)
+    and commits. Returns the number of rows created per table.
+    """
+    rnd = random.Random(spec.seed)
+    record_change(
+        db, models.Employee, models.Project, models.TimeEntry, reports=report_cache.versions_written()
+    )
+
+    _insert_chunked(db, models.Employee.__table__, [
+        {
+            "name": f"Employee {i + 1:04d}",
+            "monthly_cost": Decimal(rnd.randint(180000, 750000)) / 100,
+            "hours_per_month": rnd.choice([80, 120, 140, 160, 160, 160, 173]),
+        }
+        for i in range(spec.employees)
+    ])
+    projects = []
+    for i in range(spec.projects):
+        fixed = rnd.random() < spec.fixed_ratio
+        projects.append({
+            "name": f"Project {i + 1:04d}",
+            "price_type": "fixed" if fixed else "hourly",
+            # Fixed: total price per month; hourly: price per hour
+            "price_value": Decimal(rnd.randint(500000, 8000000) if fixed else rnd.randint(3000, 15000)) / 100,
+        })
+    _insert_chunked(db, models.Project.__table__, projects)
+    employee_ids = [row_id for (row_id,) in db.query(models.Employee.id).order_by(models.Employee.id)]
+    project_ids = [row_id for (row_id,) in db.query(models.Project.id).order_by(models.Project.id)]
+
+    entries = []
+    for month in spec.month_starts():
+        start, end = get_month_range(month.year, month.month)
+        days = (end - start).days
+        for _ in range(spec.entries_per_month):
+            entries.append({
+                "employee_id": rnd.choice(employee_ids),
+                "project_id": rnd.choice(project_ids),
+                "entry_date": start + timedelta(days=rnd.randrange(days)),
+                "hours": Decimal(rnd.randint(2, 40)) / 4,
+                "note": None,
+            })
+    _insert_chunked(db, models.TimeEntry.__table__, entries)
+
+    rebuild_rollups(db)
+    db.commit()
+    return {"employees": len(employee_ids), "projects": len(project_ids), "time_entries": len(entries)}
+
+def spec_from_args(args: argparse.Namespace) -> DatasetSpec:
+    spec = SCALES[args.scale]
+    overrides = {
+        field: getattr(args, field)
+        for field in ("employees", "projects", "entries_per_month", "months", "fixed_ratio", "seed")
+        if getattr(args, field) is not None
+    }
+    return replace(spec, **overrides)
+
+def add_spec_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--employees", type=int)
+    parser.add_argument("--projects", type=int)
+    parser.add_argument("--entries-per-month", type=int)
+    parser.add_argument("--months", type=int)
+    parser.add_argument("--fixed-ratio", type=float)
+    parser.add_argument("--seed", type=int)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fill DATABASE_URL with a deterministic synthetic dataset")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    add_spec_arguments(parser)
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate all tables first")
+    args = parser.parse_args(argv)
+    spec = spec_from_args(args)
+
+    db = SessionLocal()
+    try:
+        if args.reset:
+            reset_database(db)
+        elif not database_is_empty(db):
+            print("The database already has data; use --reset to replace it", file=sys.stderr)
+            return 1
+        counts = generate_dataset(db, spec)
+    finally:
+        db.close()
+    print(", ".join(f"{count} {table}" for table, count in counts.items()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+from datetime import date
+from typing import Iterable, Iterator, List, Optional
+import csv
+import zlib
+from sqlalchemy import select
+from app import models
+from sqlalchemy.engine import Result
+from sqlalchemy.orm import Session
+from app.database import execute_read
+
+# Rows are buffered into chunks of about this size before being sent
+CSV_CHUNK_SIZE = 64 * 1024
+# Rows fetched per round-trip from the server-side cursor
+EXPORT_YIELD_PER = 1000
+
+class _Echo:
+    """File-like object whose write() hands the formatted line back"""
+
+    def write(self, value: str) -> str:
+        return value
+
+def stream_csv(rows: Iterable[List], gzip: bool = False) -> Iterator[bytes]:
+    """Format rows as CSV and yield them as encoded chunks, optionally gzipped"""
+    writer = csv.writer(_Echo())
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if gzip else None
+
+    buffer = []
+    size = 0
+    for row in rows:
+        line = writer.writerow(row)
+        buffer.append(line)
+        size += len(line)
+        if size >= CSV_CHUNK_SIZE:
+            chunk = "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+                if not chunk:
+                    continue
+            yield chunk
+
+    chunk = "".join(buffer).encode("utf-8")
+    if compressor is not None:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+def summary_csv_rows(summary_data: dict, month: str) -> Iterator[List]:
+    """Rows of the monthly summary export"""
+    # Header
+    yield ["Profit Desk Export", f"Month: {month}"]
+    yield []
+
+    # Summary
+    yield ["SUMMARY"]
+    yield ["Total Profit", summary_data["total_profit"]]
+    yield []
+
+    # Projects
+    yield ["PROJECTS"]
+    yield ["Name", "Hours", "Cost", "Revenue", "Margin", "Status"]
+    for project in summary_data["projects"]:
+        yield [
+            project.name,
+            project.hours,
+            project.cost,
+            project.revenue,
+            project.margin,
+            project.status
+        ]
+    yield []
+
+    # Employees
+    yield ["EMPLOYEES"]
+    yield ["Name", "Monthly Cost", "Revenue Attributed", "Margin", "Status"]
+    for employee in summary_data["employees"]:
+        yield [
+            employee.name,
+            employee.monthly_cost,
+            employee.revenue_attributed,
+            employee.margin,
+            employee.status
+        ]
+
+TIME_ENTRY_CSV_HEADER = [
+    "ID", "Date", "Employee ID", "Employee", "Project ID", "Project", "Hours", "Note"
+]
+
+def time_entry_csv_rows(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    user_id: Optional[int] = None
+) -> Iterator[List]:
+    """Rows of the raw time-entry export, both dates inclusive.
+
+    Uses its own read session (a replica unless user_id wrote recently) and a
+    server-side cursor (yield_per), so memory stays flat regardless of the
+    number of entries and the session lives exactly as long as the response
+    is being streamed. The query runs when this is called, falling back to
+    the primary if the replica fails, so a database error fails the request
+    before any byte is sent.
+    """
+    stmt = select(
+        models.TimeEntry.id,
+        models.TimeEntry.entry_date,
+        models.TimeEntry.employee_id,
+        models.Employee.name,
+        models.TimeEntry.project_id,
+        models.Project.name,
+        models.TimeEntry.hours,
+        models.TimeEntry.note
+    ).join(
+        models.Employee, models.Employee.id == models.TimeEntry.employee_id
+    ).join(
+        models.Project, models.Project.id == models.TimeEntry.project_id
+    )
+    if date_from is not None:
+        stmt = stmt.where(models.TimeEntry.entry_date >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(models.TimeEntry.entry_date <= date_to)
+    stmt = stmt.order_by(
+        models.TimeEntry.entry_date, models.TimeEntry.id
+    ).execution_options(yield_per=EXPORT_YIELD_PER)
+
+    db, result = execute_read(stmt, user_id)
+    return _stream_time_entry_rows(db, result)
+
+def _stream_time_entry_rows(db: Session, result: Result) -> Iterator[List]:
+    try:
+        yield TIME_ENTRY_CSV_HEADER
+        for row in result:
+            yield list(row)
+    finally:
+        db.close()
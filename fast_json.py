@@ -0,0 +1,43 @@
+from decimal import Decimal
+from typing import Iterable, List, Sequence, Tuple, Type
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy.orm import Query, Session
+
+def _default(value):
+    # Same text pydantic writes for a Decimal
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(content) -> bytes:
+    """JSON bytes matching FastAPI's output for the same plain data (UTC as Z, Decimal as string)"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+def schema_fields(schema: Type[BaseModel]) -> Tuple[str, ...]:
+    """Field names of a response schema, in the order FastAPI serializes them"""
+    return tuple(schema.model_fields)
+
+def query_columns(db: Session, model, fields: Sequence[str]) -> Query:
+    """Query selecting only the model columns behind fields, as plain rows"""
+    return db.query(*(getattr(model, field) for field in fields))
+
+def rows_response(rows: Iterable, fields: Sequence[str], response: Response) -> FastJSONResponse:
+    """JSON array of objects from column rows, skipping response_model validation.
+
+    Headers already set on the injected response (pagination cursor, ETag)
+    are carried over, since FastAPI ignores them once a Response is returned.
+    """
+    content: List[dict] = [dict(zip(fields, row)) for row in rows]
+    headers = {
+        name: value for name, value in response.headers.items()
+        if name not in ("content-length", "content-type")
+    }
+    return FastJSONResponse(content, status_code=response.status_code or 200, headers=headers)
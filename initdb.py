@@ -0,0 +1,51 @@
+from typing import List, Optional
+import argparse
+import os
+import sys
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import inspect
+from app import models  # noqa: F401  (registers the tables on Base.metadata)
+from app.database import Base, DATABASE_URL, engine
+
+def alembic_config() -> Config:
+    here = os.path.dirname(os.path.abspath(__file__))
+    config = Config(os.path.join(here, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(here, "alembic"))
+    config.set_main_option("sqlalchemy.url", DATABASE_URL)
+    return config
+
+def current_revision() -> Optional[str]:
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+def init_schema() -> bool:
+    """Bring the database up to the latest schema.
+
+    An empty database gets the tables from the models and is stamped at the
+    latest revision, since the models already include every migration.
+    Otherwise the pending migrations run; a database created by an older
+    version of the app has the baseline tables and no history, so all of
+    them run. Returns whether the tables were created.
+    """
+    if not inspect(engine).get_table_names():
+        Base.metadata.create_all(bind=engine)
+        command.stamp(alembic_config(), "head")
+        return True
+    command.upgrade(alembic_config(), "head")
+    return False
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Create or migrate the tables of DATABASE_URL (the API does not do it on import)"
+    )
+    parser.parse_args(argv)
+    if init_schema():
+        print("Tables created; migrations stamped at head")
+    else:
+        print(f"Existing database migrated to revision {current_revision()}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,36 +1,115 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import extract, func
+from contextlib import asynccontextmanager
 from datetime import datetime, date
 from typing import List, Optional
 import csv
-import io
+import logging
+import time
 
-from app.database import get_db, engine, Base
+from app.database import (
+    get_db,
+    get_async_engine,
+    async_engine_started,
+    close_session,
+    replica_may_lag,
+    replica_router,
+    run_with_session,
+    ReadSession,
+    engine
+)
+from app import IMPORT_STARTED
+from app.metrics import METRICS_TOKEN, QueryMetricsMiddleware, pool_stats, render_prometheus, startup_seconds
+from app.profiling import ProfilerMiddleware
+from app.admission import AdmissionRejected, report_admission, report_slot
+from app.fast_json import FastJSONResponse, query_columns, rows_response, schema_fields
+from app.sync import get_changes, list_etag, record_change, record_tombstone
+from app.writes import (
+    constraint_violation,
+    delete_returning,
+    insert_returning,
+    select_row,
+    update_returning
+)
 from app import models, schemas
 from app.auth import (
-    authenticate_user, 
-    create_access_token, 
+    CurrentUser,
+    PASSWORD_HASH_RETRY_AFTER_SECONDS,
+    PasswordHashingBusy,
+    authenticate_user_async, 
+    create_user_access_token, 
     get_current_user, 
     get_current_admin_user,
-    get_password_hash
+    get_password_hash,
+    get_user_by_email,
+    get_user_db,
+    get_user_read_db,
+    revoke_user_tokens,
+    run_password_job
+)
+from app.calculations import month_filter
+from app.report_engine import (
+    PROJECT_SERIES_GRANULARITIES,
+    TREND_GROUPS,
+    TREND_MAX_MONTHS,
+    generate_employee_report_data,
+    generate_project_report_data,
+    generate_project_series,
+    generate_summary_report_data,
+    generate_trend_report_data,
+    month_range
+)
+from app.month_close import (
+    MonthClosedError,
+    close_month,
+    closed_summaries,
+    ensure_months_open,
+    get_snapshot,
+    list_closed_months,
+    reopen_month,
+    snapshot_employee_report,
+    snapshot_hourly_costs,
+    snapshot_project_report,
+    snapshot_summary
+)
+from app.report_cache import MonthKey, report_cache, etag_matches
+from app.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    paginate_by_id,
+    paginate_time_entries
 )
-from app.calculations import (
-    calculate_project_costs,
-    calculate_project_revenue,
-    calculate_project_margin,
-    get_project_status,
-    calculate_employee_revenue_attributed,
-    calculate_employee_margin,
-    get_employee_status
+from app.bulk_import import import_time_entries, parse_time_entry_csv
+from app.exports import stream_csv, summary_csv_rows, time_entry_csv_rows
+from app.rollups import (
+    entry_snapshot,
+    apply_time_entry_change
 )
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Profit Desk API", version="1.0.0")
+# Importing the app does not touch the database: tables are created by
+# `python -m app.initdb` or Alembic, and connections open on first use
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_seconds["startup"] = time.perf_counter() - IMPORT_STARTED
+    logger.info(
+        "Imported in %.0f ms, ready to serve in %.0f ms",
+        startup_seconds["import"] * 1000, startup_seconds["startup"] * 1000
+    )
+    yield
+
+app = FastAPI(title="Profit Desk API", version="1.0.0", lifespan=lifespan)
+
+# Admin opt-in profiling of single requests (X-Profile header or ?profile=)
+app.add_middleware(ProfilerMiddleware)
 
 # CORS middleware
 app.add_middleware(
@@ -39,13 +118,77 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Server-Timing", "X-Profile-File"],
 )
 
+# Query count and database time per request (Server-Timing, /metrics, N+1 log)
+app.add_middleware(QueryMetricsMiddleware)
+
 # Auth endpoints
+@app.exception_handler(PasswordHashingBusy)
+def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many concurrent logins, please retry"},
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)}
+    )
+
+@app.exception_handler(AdmissionRejected)
+def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many reports being computed, please retry"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(MonthClosedError)
+def month_closed_handler(request: Request, exc: MonthClosedError):
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": f"Month {exc.month:%Y-%m} is closed; reopen it to change its time entries"}
+    )
+
+# Writes leave referential checks to the database constraints
+_VIOLATION_STATUS = {
+    "foreign_key": status.HTTP_422_UNPROCESSABLE_ENTITY,
+    "unique": status.HTTP_409_CONFLICT,
+    "check": status.HTTP_422_UNPROCESSABLE_ENTITY,
+    "not_null": status.HTTP_422_UNPROCESSABLE_ENTITY,
+}
+
+@app.exception_handler(IntegrityError)
+def integrity_error_handler(request: Request, exc: IntegrityError):
+    kind, constraint = constraint_violation(exc)
+    if kind is None:
+        raise exc
+    if kind == "foreign_key" and request.method == "DELETE":
+        # Deleting a row that other rows still reference
+        status_code, detail = status.HTTP_409_CONFLICT, "Still referenced by other records"
+    elif kind == "foreign_key":
+        status_code, detail = _VIOLATION_STATUS[kind], "Referenced record does not exist"
+    else:
+        status_code, detail = _VIOLATION_STATUS[kind], f"Violates a {kind.replace('_', ' ')} constraint"
+    if constraint:
+        detail = f"{detail} ({constraint})"
+    return JSONResponse(status_code=status_code, content={"detail": detail})
+
+def _create_user(db: Session, user_data: schemas.UserCreate, hashed_password: str):
+    db_user = models.User(
+        email=user_data.email,
+        password_hash=hashed_password,
+        role=user_data.role
+    )
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+# Login and register are async so bcrypt runs on its own bounded executor
+# (see app.auth.run_password_job) and database access on the threadpool
 @app.post("/auth/register", response_model=schemas.Token)
-def register(user_data: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: schemas.UserCreate, db: Session = Depends(get_db)):
     # Check if user exists
-    existing_user = db.query(models.User).filter(models.User.email == user_data.email).first()
+    existing_user = await run_in_threadpool(get_user_by_email, db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -53,210 +196,390 @@ def register(user_data: schemas.UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create user
-    hashed_password = get_password_hash(user_data.password)
-    db_user = models.User(
-        email=user_data.email,
-        password_hash=hashed_password,
-        role=user_data.role
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    hashed_password = await run_password_job(get_password_hash, user_data.password)
+    db_user = await run_in_threadpool(_create_user, db, user_data, hashed_password)
     
     # Create token
-    access_token = create_access_token(data={"sub": db_user.email})
+    access_token = create_user_access_token(db_user)
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.post("/auth/login", response_model=schemas.Token)
-def login(credentials: schemas.UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, credentials.email, credentials.password)
+async def login(credentials: schemas.UserLogin, db: Session = Depends(get_db)):
+    user = await authenticate_user_async(db, credentials.email, credentials.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_user_access_token(user)
     return {"access_token": access_token, "token_type": "bearer"}
 
+@app.post("/auth/revoke")
+def revoke_tokens(
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Sign out everywhere: every token issued to the current user stops working"""
+    user = db.query(models.User).filter(models.User.id == current_user.id).first()
+    revoke_user_tokens(db, user)
+    return {"message": "Tokens revoked"}
+
+# List endpoints select plain column rows and encode them with orjson; the
+# response_model still documents the payload, which has the same shape
+EMPLOYEE_FIELDS = schema_fields(schemas.Employee)
+PROJECT_FIELDS = schema_fields(schemas.Project)
+TIME_ENTRY_FIELDS = schema_fields(schemas.TimeEntry)
+
+def _list_not_modified(
+    db: Session, model, name: str, if_none_match: Optional[str], response: Response, *params
+) -> Optional[Response]:
+    """Set the list ETag on response, or return a 304 if the client already has it"""
+    etag = list_etag(db, model, name, *params)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
 # Employee endpoints
 @app.get("/employees", response_model=List[schemas.Employee])
-def get_employees(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+async def get_employees(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: ReadSession = Depends(get_user_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    return await run_with_session(
+        db, _list_employees, cursor, limit, response, request.headers.get("if-none-match")
+    )
+
+def _list_employees(
+    db: Session, cursor: Optional[str], limit: int, response: Response, if_none_match: Optional[str] = None
 ):
-    return db.query(models.Employee).all()
+    not_modified = _list_not_modified(db, models.Employee, "employees", if_none_match, response, cursor, limit)
+    if not_modified:
+        return not_modified
+    query = query_columns(db, models.Employee, EMPLOYEE_FIELDS)
+    rows = paginate_by_id(query, models.Employee, cursor, limit, response)
+    return rows_response(rows, EMPLOYEE_FIELDS, response)
 
 @app.post("/employees", response_model=schemas.Employee)
 def create_employee(
     employee: schemas.EmployeeCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_admin_user)
 ):
-    db_employee = models.Employee(**employee.dict())
-    db.add(db_employee)
+    record_change(db, models.Employee, reports=report_cache.versions_written())
+    row = insert_returning(db, models.Employee, employee.dict())
     db.commit()
-    db.refresh(db_employee)
-    return db_employee
+    return row._asdict()
 
 @app.put("/employees/{employee_id}", response_model=schemas.Employee)
 def update_employee(
     employee_id: int,
     employee: schemas.EmployeeUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_admin_user)
 ):
-    db_employee = db.query(models.Employee).filter(models.Employee.id == employee_id).first()
-    if not db_employee:
-        raise HTTPException(status_code=404, detail="Employee not found")
-    
     update_data = employee.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_employee, field, value)
+    record_change(db, models.Employee, reports=report_cache.versions_written())
+    row = update_returning(db, models.Employee, employee_id, update_data)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Employee not found")
     
     db.commit()
-    db.refresh(db_employee)
-    return db_employee
+    return row._asdict()
 
 @app.delete("/employees/{employee_id}")
 def delete_employee(
     employee_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_admin_user)
 ):
-    db_employee = db.query(models.Employee).filter(models.Employee.id == employee_id).first()
-    if not db_employee:
+    record_change(db, models.Employee, reports=report_cache.versions_written())
+    # Time entries keep the employee (409 from the foreign key); rollups cascade
+    if delete_returning(db, models.Employee, employee_id) is None:
         raise HTTPException(status_code=404, detail="Employee not found")
     
-    db.delete(db_employee)
+    record_tombstone(db, models.Employee, employee_id)
     db.commit()
     return {"message": "Employee deleted"}
 
 # Project endpoints
 @app.get("/projects", response_model=List[schemas.Project])
-def get_projects(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+async def get_projects(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: ReadSession = Depends(get_user_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    return await run_with_session(
+        db, _list_projects, cursor, limit, response, request.headers.get("if-none-match")
+    )
+
+def _list_projects(
+    db: Session, cursor: Optional[str], limit: int, response: Response, if_none_match: Optional[str] = None
 ):
-    return db.query(models.Project).all()
+    not_modified = _list_not_modified(db, models.Project, "projects", if_none_match, response, cursor, limit)
+    if not_modified:
+        return not_modified
+    query = query_columns(db, models.Project, PROJECT_FIELDS)
+    rows = paginate_by_id(query, models.Project, cursor, limit, response)
+    return rows_response(rows, PROJECT_FIELDS, response)
 
 @app.post("/projects", response_model=schemas.Project)
 def create_project(
     project: schemas.ProjectCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_admin_user)
 ):
-    db_project = models.Project(**project.dict())
-    db.add(db_project)
+    record_change(db, models.Project, reports=report_cache.versions_written())
+    row = insert_returning(db, models.Project, project.dict())
     db.commit()
-    db.refresh(db_project)
-    return db_project
+    return row._asdict()
 
 @app.put("/projects/{project_id}", response_model=schemas.Project)
 def update_project(
     project_id: int,
     project: schemas.ProjectUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_admin_user)
 ):
-    db_project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if not db_project:
+    record_change(db, models.Project, reports=report_cache.versions_written())
+    row = update_returning(db, models.Project, project_id, project.dict(exclude_unset=True))
+    if row is None:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    update_data = project.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_project, field, value)
-    
     db.commit()
-    db.refresh(db_project)
-    return db_project
+    return row._asdict()
 
 @app.delete("/projects/{project_id}")
 def delete_project(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_admin_user)
 ):
-    db_project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if not db_project:
+    record_change(db, models.Project, reports=report_cache.versions_written())
+    if delete_returning(db, models.Project, project_id) is None:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    db.delete(db_project)
+    record_tombstone(db, models.Project, project_id)
     db.commit()
     return {"message": "Project deleted"}
 
 # Time Entry endpoints
+# Columns of a time entry that make up its rollups.EntrySnapshot
+SNAPSHOT_COLUMNS = ("employee_id", "project_id", "entry_date", "hours")
+# Time-entry writes bump the report versions of their months in
+# ensure_months_open / lock_months, then the table counter before the row write
+
 @app.get("/time-entries", response_model=List[schemas.TimeEntry])
-def get_time_entries(
+async def get_time_entries(
+    request: Request,
+    response: Response,
     month: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    employee_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: ReadSession = Depends(get_user_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    return await run_with_session(
+        db, _list_time_entries,
+        month, employee_id, project_id, date_from, date_to, cursor, limit, response,
+        request.headers.get("if-none-match")
+    )
+
+def _list_time_entries(
+    db: Session,
+    month: Optional[str],
+    employee_id: Optional[int],
+    project_id: Optional[int],
+    date_from: Optional[date],
+    date_to: Optional[date],
+    cursor: Optional[str],
+    limit: int,
+    response: Response,
+    if_none_match: Optional[str] = None
 ):
-    query = db.query(models.TimeEntry)
+    not_modified = _list_not_modified(
+        db, models.TimeEntry, "time-entries", if_none_match, response,
+        month, employee_id, project_id, date_from, date_to, cursor, limit
+    )
+    if not_modified:
+        return not_modified
+    query = query_columns(db, models.TimeEntry, TIME_ENTRY_FIELDS)
     
     if month:
         year, month_num = map(int, month.split("-"))
-        query = query.filter(
-            extract('year', models.TimeEntry.entry_date) == year,
-            extract('month', models.TimeEntry.entry_date) == month_num
-        )
-    
-    return query.order_by(models.TimeEntry.entry_date.desc()).all()
+        query = query.filter(month_filter(year, month_num))
+    if employee_id is not None:
+        query = query.filter(models.TimeEntry.employee_id == employee_id)
+    if project_id is not None:
+        query = query.filter(models.TimeEntry.project_id == project_id)
+    if date_from is not None:
+        query = query.filter(models.TimeEntry.entry_date >= date_from)
+    if date_to is not None:
+        query = query.filter(models.TimeEntry.entry_date <= date_to)
+    
+    rows = paginate_time_entries(query, cursor, limit, response)
+    return rows_response(rows, TIME_ENTRY_FIELDS, response)
 
 @app.post("/time-entries", response_model=schemas.TimeEntry)
 def create_time_entry(
     time_entry: schemas.TimeEntryCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    db_entry = models.TimeEntry(**time_entry.dict())
-    db.add(db_entry)
+    ensure_months_open(db, time_entry.entry_date)
+    record_change(db, models.TimeEntry)
+    row = insert_returning(db, models.TimeEntry, time_entry.dict())
+    new_snapshot = entry_snapshot(row)
+    apply_time_entry_change(db, None, new_snapshot)
     db.commit()
-    db.refresh(db_entry)
-    return db_entry
+    return row._asdict()
+
+@app.post("/time-entries/bulk", response_model=schemas.TimeEntryBulkResult)
+async def bulk_create_time_entries(
+    request: Request,
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Create many time entries from a JSON array or a multipart CSV upload (field "file")"""
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Missing CSV file")
+        try:
+            rows = parse_time_entry_csv(await upload.read())
+        except (UnicodeDecodeError, csv.Error):
+            raise HTTPException(status_code=400, detail="Invalid CSV file")
+    else:
+        try:
+            rows = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of time entries")
+    
+    return await run_in_threadpool(_import_time_entries, db, rows)
+
+def _import_time_entries(db: Session, rows: list):
+    result = import_time_entries(db, rows)
+    db.commit()
+    return result
 
 @app.put("/time-entries/{entry_id}", response_model=schemas.TimeEntry)
 def update_time_entry(
     entry_id: int,
     time_entry: schemas.TimeEntryUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    db_entry = db.query(models.TimeEntry).filter(models.TimeEntry.id == entry_id).first()
-    if not db_entry:
+    # The entry stays locked from the closed-month check until the commit
+    old = select_row(db, models.TimeEntry, entry_id, SNAPSHOT_COLUMNS, for_update=True)
+    if old is None:
         raise HTTPException(status_code=404, detail="Time entry not found")
     
+    old_snapshot = tuple(old)
     update_data = time_entry.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_entry, field, value)
+    ensure_months_open(db, old_snapshot[2], update_data.get("entry_date") or old_snapshot[2])
+    record_change(db, models.TimeEntry)
+    row = update_returning(db, models.TimeEntry, entry_id, update_data)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Time entry not found")
     
+    new_snapshot = entry_snapshot(row)
+    apply_time_entry_change(db, old_snapshot, new_snapshot)
     db.commit()
-    db.refresh(db_entry)
-    return db_entry
+    return row._asdict()
 
 @app.delete("/time-entries/{entry_id}")
 def delete_time_entry(
     entry_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    db_entry = db.query(models.TimeEntry).filter(models.TimeEntry.id == entry_id).first()
-    if not db_entry:
+    old = select_row(db, models.TimeEntry, entry_id, SNAPSHOT_COLUMNS, for_update=True)
+    if old is None:
+        raise HTTPException(status_code=404, detail="Time entry not found")
+    
+    old_snapshot = tuple(old)
+    ensure_months_open(db, old_snapshot[2])
+    record_change(db, models.TimeEntry)
+    if delete_returning(db, models.TimeEntry, entry_id) is None:
         raise HTTPException(status_code=404, detail="Time entry not found")
     
-    db.delete(db_entry)
+    apply_time_entry_change(db, old_snapshot, None)
+    record_tombstone(db, models.TimeEntry, entry_id)
     db.commit()
     return {"message": "Time entry deleted"}
 
+# Delta sync
+@app.get("/sync", response_model=schemas.SyncChanges)
+def sync_changes(
+    since: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Employees, projects and time entries changed or deleted since a previous sync token.
+
+    Served from the primary, so replication lag cannot hide a change from a token.
+    """
+    return FastJSONResponse(get_changes(db, since))
+
 # Report endpoints
+def _not_modified(request: Request, etag: str) -> Optional[Response]:
+    """304 response when the client already holds the current version of a report"""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+async def _report_version(db: ReadSession, month: MonthKey) -> str:
+    """Data version of a month's reports (see ReportCache.data_version).
+
+    Closing the session returns its connection to the pool while the report
+    waits for an admission slot; the next use opens a new one. If the replica
+    fails here, the version, the report and replica_may_lag all come from the
+    primary (see run_with_session).
+    """
+    version = await run_with_session(db, report_cache.data_version, month)
+    await close_session(db)
+    return version
+
+def _report_headers(etag: str, store: bool) -> dict:
+    """ETag of a report, unless it was computed on a replica that may lag
+    (store=False): clients must not keep that copy and revalidate it"""
+    return {"ETag": etag} if store else {"Cache-Control": "no-store"}
+
 @app.get("/report/summary", response_model=schemas.SummaryReport)
-def get_summary_report(
+async def get_summary_report(
     month: str,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    db: ReadSession = Depends(get_user_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     year, month_num = map(int, month.split("-"))
-    summary_data = _generate_summary_report_data(db, year, month_num)
+    version = await _report_version(db, (year, month_num))
+    etag = report_cache.etag("summary", (year, month_num), None, version)
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    
+    store = not replica_may_lag(db)
+    summary_data = await _get_cached_summary_report_data(db, year, month_num, version, store)
+    response.headers.update(_report_headers(etag, store))
     
     return schemas.SummaryReport(
         month=month,
@@ -266,213 +589,285 @@ def get_summary_report(
     )
 
 @app.get("/report/employee/{employee_id}")
-def get_employee_report(
+async def get_employee_report(
     employee_id: int,
     month: str,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    db: ReadSession = Depends(get_user_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    employee = db.query(models.Employee).filter(models.Employee.id == employee_id).first()
-    if not employee:
-        raise HTTPException(status_code=404, detail="Employee not found")
-    
     year, month_num = map(int, month.split("-"))
-    
-    revenue_attributed = calculate_employee_revenue_attributed(
-        db, employee_id, year, month_num
+    version = await _report_version(db, (year, month_num))
+    etag = report_cache.etag("employee", (year, month_num), employee_id, version)
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    
+    store = not replica_may_lag(db)
+    report = await report_cache.get_or_compute_async(
+        "employee", (year, month_num), employee_id, version,
+        lambda: report_admission.run(run_with_session, db, _generate_employee_report_data, employee_id, year, month_num),
+        store=store
     )
-    margin = calculate_employee_margin(revenue_attributed, employee.monthly_cost)
-    status = get_employee_status(margin, employee.monthly_cost)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Employee not found")
     
-    return {
-        "employee": {
-            "id": employee.id,
-            "name": employee.name,
-            "monthly_cost": employee.monthly_cost,
-            "hours_per_month": employee.hours_per_month
-        },
-        "month": month,
-        "revenue_attributed": revenue_attributed,
-        "margin": margin,
-        "status": status
-    }
+    response.headers.update(_report_headers(etag, store))
+    return {**report, "month": month}
 
 @app.get("/report/project/{project_id}")
-def get_project_report(
+async def get_project_report(
     project_id: int,
     month: str,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    granularity: Optional[str] = Query(None, pattern="^(" + "|".join(PROJECT_SERIES_GRANULARITIES) + ")$"),
+    db: ReadSession = Depends(get_user_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
+    """Project report with the per-employee breakdown; granularity=day|week adds an hours/cost series"""
     year, month_num = map(int, month.split("-"))
+    report_type = f"project-{granularity}" if granularity else "project"
+    version = await _report_version(db, (year, month_num))
+    etag = report_cache.etag(report_type, (year, month_num), project_id, version)
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    
+    store = not replica_may_lag(db)
+    report = await report_cache.get_or_compute_async(
+        report_type, (year, month_num), project_id, version,
+        lambda: report_admission.run(
+            run_with_session, db, _generate_project_report_data, project_id, year, month_num, granularity
+        ),
+        store=store
+    )
+    if report is None:
+        raise HTTPException(status_code=404, detail="Project not found")
     
-    cost = calculate_project_costs(db, project_id, year, month_num)
-    revenue = calculate_project_revenue(project, year, month_num, db)
-    margin = calculate_project_margin(revenue, cost)
-    status = get_project_status(margin, revenue)
-    
-    # Get breakdown by employee
-    entries = db.query(models.TimeEntry).join(models.Employee).filter(
-        models.TimeEntry.project_id == project_id,
-        extract('year', models.TimeEntry.entry_date) == year,
-        extract('month', models.TimeEntry.entry_date) == month_num
-    ).all()
-    
-    breakdown = []
-    for entry in entries:
-        hourly_cost = entry.employee.monthly_cost / entry.employee.hours_per_month
-        breakdown.append({
-            "employee_id": entry.employee.id,
-            "employee_name": entry.employee.name,
-            "hours": entry.hours,
-            "cost": entry.hours * hourly_cost,
-            "percentage": 0  # Will calculate below
-        })
-    
-    total_hours = sum(b["hours"] for b in breakdown)
-    for item in breakdown:
-        if total_hours > 0:
-            item["percentage"] = (item["hours"] / total_hours) * 100
-    
-    return {
-        "project": {
-            "id": project.id,
-            "name": project.name,
-            "price_type": project.price_type,
-            "price_value": project.price_value
-        },
-        "month": month,
-        "hours": total_hours,
-        "cost": cost,
-        "revenue": revenue,
-        "margin": margin,
-        "status": status,
-        "breakdown": breakdown
-    }
+    response.headers.update(_report_headers(etag, store))
+    return {**report, "month": month}
+
+@app.get("/report/trend", response_model=schemas.TrendReport)
+async def get_trend_report(
+    month_from: str = Query(..., alias="from"),
+    month_to: str = Query(..., alias="to"),
+    group: str = Query("total", pattern="^(" + "|".join(TREND_GROUPS) + ")$"),
+    db: ReadSession = Depends(get_user_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Monthly series of hours, cost, revenue, margin and status between two months (inclusive)"""
+    try:
+        first_month = datetime.strptime(month_from, "%Y-%m").date()
+        last_month = datetime.strptime(month_to, "%Y-%m").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from and to must be YYYY-MM")
+    if first_month > last_month:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+    if len(month_range(first_month, last_month)) > TREND_MAX_MONTHS:
+        raise HTTPException(status_code=400, detail=f"A trend covers at most {TREND_MAX_MONTHS} months")
+    
+    series = await report_admission.run(
+        run_with_session, db, _generate_trend_report_data, first_month, last_month, group
+    )
+    return schemas.TrendReport(month_from=month_from, month_to=month_to, group=group, series=series)
+
+def _generate_employee_report_data(db: Session, employee_id: int, year: int, month_num: int):
+    """Employee report for a month (from its snapshot if closed), or None if not found"""
+    snapshot = get_snapshot(db, year, month_num)
+    if snapshot is not None:
+        return snapshot_employee_report(snapshot, employee_id)
+    return generate_employee_report_data(db, employee_id, year, month_num)
+
+def _generate_project_report_data(
+    db: Session,
+    project_id: int,
+    year: int,
+    month_num: int,
+    granularity: Optional[str] = None
+):
+    """Project report for a month (from its snapshot if closed), or None if not found"""
+    snapshot = get_snapshot(db, year, month_num)
+    if snapshot is None:
+        return generate_project_report_data(db, project_id, year, month_num, granularity)
+    
+    report = snapshot_project_report(snapshot, project_id)
+    if report is not None and granularity is not None:
+        # Closed months keep their time entries; costs use the rates frozen at close
+        report["series"] = generate_project_series(
+            db, project_id, year, month_num, granularity, snapshot_hourly_costs(snapshot)
+        )
+    return report
 
 # Helper function to generate summary report data
 def _generate_summary_report_data(db: Session, year: int, month_num: int):
     """Helper function to generate summary report data (used by both endpoint and CSV export)"""
-    # Get all projects
-    projects = db.query(models.Project).all()
-    project_reports = []
-    
-    for project in projects:
-        cost = calculate_project_costs(db, project.id, year, month_num)
-        revenue = calculate_project_revenue(project, year, month_num, db)
-        margin = calculate_project_margin(revenue, cost)
-        status = get_project_status(margin, revenue)
-        
-        # Calculate total hours
-        total_hours = db.query(func.sum(models.TimeEntry.hours)).filter(
-            models.TimeEntry.project_id == project.id,
-            extract('year', models.TimeEntry.entry_date) == year,
-            extract('month', models.TimeEntry.entry_date) == month_num
-        ).scalar() or 0
-        
-        project_reports.append(schemas.ProjectReport(
-            id=project.id,
-            name=project.name,
-            hours=total_hours,
-            cost=cost,
-            revenue=revenue,
-            margin=margin,
-            status=status
-        ))
-    
-    # Get all employees
-    employees = db.query(models.Employee).all()
-    employee_reports = []
-    
-    for employee in employees:
-        revenue_attributed = calculate_employee_revenue_attributed(
-            db, employee.id, year, month_num
-        )
-        margin = calculate_employee_margin(revenue_attributed, employee.monthly_cost)
-        status = get_employee_status(margin, employee.monthly_cost)
-        
-        employee_reports.append(schemas.EmployeeReport(
-            id=employee.id,
-            name=employee.name,
-            monthly_cost=employee.monthly_cost,
-            revenue_attributed=revenue_attributed,
-            margin=margin,
-            status=status
-        ))
-    
-    # Calculate total profit
-    total_profit = sum(pr.margin for pr in project_reports)
-    
-    return {
-        "total_profit": total_profit,
-        "projects": project_reports,
-        "employees": employee_reports
-    }
+    snapshot = get_snapshot(db, year, month_num)
+    if snapshot is not None:
+        return snapshot_summary(snapshot)
+    return generate_summary_report_data(db, year, month_num)
+
+def _generate_trend_report_data(db: Session, first_month: date, last_month: date, group: str):
+    return generate_trend_report_data(
+        db, first_month, last_month, group, closed_summaries(db, first_month, last_month)
+    )
+
+async def _get_cached_summary_report_data(db: ReadSession, year: int, month_num: int, version: str, store: bool):
+    """Summary report data from the report cache, computed on a miss (and cached if store)"""
+    return await report_cache.get_or_compute_async(
+        "summary", (year, month_num), None, version,
+        lambda: report_admission.run(run_with_session, db, _generate_summary_report_data, year, month_num),
+        store=store
+    )
 
 # Export CSV
+def _accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "").lower()
+
+def _csv_response(rows, filename: str, gzip: bool, headers: Optional[dict] = None) -> StreamingResponse:
+    """Stream CSV rows as they are produced instead of building the file in memory"""
+    response_headers = {"Content-Disposition": f"attachment; filename={filename}", "Vary": "Accept-Encoding"}
+    if gzip:
+        response_headers["Content-Encoding"] = "gzip"
+    response_headers.update(headers or {})
+    return StreamingResponse(
+        stream_csv(rows, gzip=gzip),
+        media_type="text/csv",
+        headers=response_headers
+    )
+
 @app.get("/export/csv")
-def export_csv(
+async def export_csv(
     month: str,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    request: Request,
+    db: ReadSession = Depends(get_user_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     year, month_num = map(int, month.split("-"))
+    gzip = _accepts_gzip(request)
+    version = await _report_version(db, (year, month_num))
+    etag = report_cache.etag("csv-gzip" if gzip else "csv", (year, month_num), None, version)
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
     
     # Get summary report data
-    summary_data = _generate_summary_report_data(db, year, month_num)
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow(["Profit Desk Export", f"Month: {month}"])
-    writer.writerow([])
-    
-    # Write summary
-    writer.writerow(["SUMMARY"])
-    writer.writerow(["Total Profit", summary_data["total_profit"]])
-    writer.writerow([])
-    
-    # Write projects
-    writer.writerow(["PROJECTS"])
-    writer.writerow(["Name", "Hours", "Cost", "Revenue", "Margin", "Status"])
-    for project in summary_data["projects"]:
-        writer.writerow([
-            project.name,
-            project.hours,
-            project.cost,
-            project.revenue,
-            project.margin,
-            project.status
-        ])
-    writer.writerow([])
-    
-    # Write employees
-    writer.writerow(["EMPLOYEES"])
-    writer.writerow(["Name", "Monthly Cost", "Revenue Attributed", "Margin", "Status"])
-    for employee in summary_data["employees"]:
-        writer.writerow([
-            employee.name,
-            employee.monthly_cost,
-            employee.revenue_attributed,
-            employee.margin,
-            employee.status
-        ])
-    
-    output.seek(0)
-    
-    return StreamingResponse(
-        io.BytesIO(output.getvalue().encode('utf-8')),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=profitdesk_{month}.csv"}
+    store = not replica_may_lag(db)
+    summary_data = await _get_cached_summary_report_data(db, year, month_num, version, store)
+    
+    return _csv_response(
+        summary_csv_rows(summary_data, month),
+        f"profitdesk_{month}.csv",
+        gzip,
+        _report_headers(etag, store)
+    )
+
+@app.get("/export/time-entries.csv", dependencies=[Depends(report_slot)])
+def export_time_entries_csv(
+    request: Request,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Every time entry between from and to (inclusive), with employee and project names"""
+    filename = f"profitdesk_time_entries_{date_from or 'start'}_{date_to or 'end'}.csv"
+    return _csv_response(
+        time_entry_csv_rows(date_from, date_to, current_user.id),
+        filename,
+        _accepts_gzip(request)
     )
 
+# Month close
+def _parse_month(month: str) -> date:
+    try:
+        return datetime.strptime(month, "%Y-%m").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="month must be YYYY-MM")
+
+@app.get("/months/closed", response_model=List[schemas.ClosedMonth])
+async def get_closed_months(
+    db: ReadSession = Depends(get_user_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    rows = await run_with_session(db, list_closed_months)
+    return [
+        schemas.ClosedMonth(month=f"{month:%Y-%m}", closed_at=closed_at, closed_by=closed_by)
+        for month, closed_at, closed_by in rows
+    ]
+
+@app.post("/months/{month}/close", response_model=schemas.ClosedMonth)
+def close_month_endpoint(
+    month: str,
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_admin_user)
+):
+    """Freeze the month's reports with the current cost rates and block writes to its time entries"""
+    first_day = _parse_month(month)
+    try:
+        snapshot = close_month(db, first_day.year, first_day.month, current_user.id)
+    except MonthClosedError:
+        raise HTTPException(status_code=409, detail=f"Month {month} is already closed")
+    db.commit()
+    return schemas.ClosedMonth(month=month, closed_at=snapshot.closed_at, closed_by=snapshot.closed_by)
+
+@app.post("/months/{month}/reopen")
+def reopen_month_endpoint(
+    month: str,
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_admin_user)
+):
+    """Drop the month's snapshot: its reports are computed from live data again"""
+    first_day = _parse_month(month)
+    if not reopen_month(db, first_day.year, first_day.month):
+        raise HTTPException(status_code=404, detail=f"Month {month} is not closed")
+    report_cache.invalidate(db, [(first_day.year, first_day.month)])
+    db.commit()
+    return {"message": f"Month {month} reopened"}
+
+# Metrics
+def _engines() -> dict:
+    """Every engine created so far, by metrics name"""
+    engines = {"primary": engine}
+    if async_engine_started():
+        engines["primary-async"] = get_async_engine().sync_engine
+    engines.update(replica_router.engines())
+    return engines
+
+@app.get("/metrics/pool")
+def get_pool_metrics(current_user: CurrentUser = Depends(get_current_admin_user)):
+    """Connection pool gauges and checkout wait-time histograms, for capacity tuning"""
+    return {name: pool_stats(pool_engine) for name, pool_engine in _engines().items()}
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics(request: Request):
+    """Route latency, per-route database time and query counts, and pool metrics for Prometheus"""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(
+        render_prometheus(_engines(), [report_admission]),
+        media_type="text/plain; version=0.0.4"
+    )
+
+@app.get("/health/live")
+def liveness():
+    """The process is up; does not touch the database"""
+    return {"status": "alive", **{f"{phase}_seconds": round(seconds, 3) for phase, seconds in startup_seconds.items()}}
+
+@app.get("/health/ready")
+def readiness():
+    """Whether the primary database answers; 503 until it does"""
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as exc:
+        logger.warning("Readiness check failed: %s", exc)
+        return JSONResponse(status_code=503, content={"status": "unavailable", "detail": "Database unavailable"})
+    return {"status": "ready"}
+
 @app.get("/")
 def root():
     return {"message": "Profit Desk API", "version": "1.0.0"}
 
+# Everything above ran at import; /metrics and /health/live report it
+startup_seconds["import"] = time.perf_counter() - IMPORT_STARTED
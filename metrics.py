@@ -0,0 +1,347 @@
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+# A request running the same statement more than this many times is logged as
+# a probable N+1; 0 disables the check
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+# When set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Seconds; the last bucket is +Inf
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class Histogram:
+    """Thread-safe cumulative histogram in the Prometheus style"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative: List = []
+        running = 0
+        for bound, bucket_count in zip(list(self.buckets) + ["+Inf"], counts):
+            running += bucket_count
+            cumulative.append((bound, running))
+        return {"buckets": cumulative, "sum": total, "count": count}
+
+# Seconds from the app package import to the end of app.main's import
+# ("import") and to the server being ready ("startup")
+startup_seconds: Dict[str, float] = {}
+
+# Time spent waiting for a pooled connection, per engine name
+pool_wait_seconds: Dict[str, Histogram] = {}
+
+def _record_wait(pool, started: float) -> None:
+    name = getattr(pool, "metrics_name", "default")
+    histogram = pool_wait_seconds.get(name)
+    if histogram is None:
+        histogram = pool_wait_seconds.setdefault(name, Histogram())
+    histogram.observe(time.perf_counter() - started)
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection"""
+
+    metrics_name = "primary"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _record_wait(self, started)
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    metrics_name = "primary-async"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _record_wait(self, started)
+
+def instrumented_pool_class(name: str, is_async: bool = False):
+    """Pool class whose wait times are recorded under name"""
+    base = InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool
+    return type(f"{base.__name__}[{name}]", (base,), {"metrics_name": name})
+
+def pool_stats(engine) -> dict:
+    """Live pool gauges plus the wait-time histogram of an engine"""
+    pool = engine.pool
+    stats = {"status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    histogram = pool_wait_seconds.get(getattr(pool, "metrics_name", "default"))
+    stats["wait_seconds"] = histogram.snapshot() if histogram else Histogram().snapshot()
+    return stats
+
+@dataclass
+class RequestStats:
+    """Database work done while serving one request"""
+
+    queries: int = 0
+    db_seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: Optional[str] = None
+    statements: Counter = field(default_factory=Counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, statement: str, seconds: float) -> None:
+        with self._lock:
+            self.queries += 1
+            self.db_seconds += seconds
+            self.statements[statement] += 1
+            if seconds > self.slowest_seconds:
+                self.slowest_seconds = seconds
+                self.slowest_statement = statement
+
+    def repeated_statements(self, threshold: int) -> List[Tuple[str, int]]:
+        with self._lock:
+            return [(statement, count) for statement, count in self.statements.items() if count > threshold]
+
+# Stats of the request being served; threadpool and run_sync calls share the
+# same object because they copy the request's context
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append((context, time.perf_counter()))
+
+def _record_query(conn, statement: str) -> None:
+    _, started = conn.info["query_started"].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_query(conn, statement)
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; errors raised
+    # elsewhere (connecting, fetching rows) have no pending start of their own
+    conn = exception_context.connection
+    pending = conn.info.get("query_started") if conn is not None else None
+    if pending and pending[-1][0] is exception_context.execution_context:
+        _record_query(conn, exception_context.statement)
+
+def instrument_engine(engine) -> None:
+    """Attribute the queries of a (sync) engine to the current request"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+class RouteMetrics:
+    """Per-route latency histograms and database counters"""
+
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.db_seconds: Dict[Tuple[str, str], Histogram] = {}
+        self.queries: Counter = Counter()
+        self.n_plus_one: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, seconds: float, stats: RequestStats, repeated: int) -> None:
+        key = (method, route)
+        with self._lock:
+            latency = self.latency.get(key)
+            if latency is None:
+                latency = self.latency[key] = Histogram()
+                self.db_seconds[key] = Histogram()
+            db_seconds = self.db_seconds[key]
+            self.queries[key] += stats.queries
+            if repeated:
+                self.n_plus_one[key] += repeated
+        latency.observe(seconds)
+        db_seconds.observe(stats.db_seconds)
+
+    def items(self):
+        with self._lock:
+            return [
+                (key, self.latency[key], self.db_seconds[key], self.queries[key], self.n_plus_one[key])
+                for key in sorted(self.latency)
+            ]
+
+route_metrics = RouteMetrics()
+
+def _route_path(scope) -> str:
+    # Starlette 0.27 does not put the matched route in the scope, only the endpoint
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is not None and app is not None:
+        for route in app.router.routes:
+            if getattr(route, "endpoint", None) is endpoint:
+                return route.path
+    return "unmatched"
+
+def server_timing(stats: RequestStats, total_seconds: float) -> str:
+    parts = [
+        f'db;dur={stats.db_seconds * 1000:.3f};desc="{stats.queries} queries"',
+        f"db-slowest;dur={stats.slowest_seconds * 1000:.3f}",
+        f"total;dur={total_seconds * 1000:.3f}",
+    ]
+    return ", ".join(parts)
+
+class QueryMetricsMiddleware:
+    """ASGI middleware that tracks the queries of each request.
+
+    Adds a Server-Timing header (query count, database time, slowest query),
+    feeds route_metrics and logs statements repeated more than
+    N_PLUS_ONE_THRESHOLD times in one request.
+    """
+
+    def __init__(self, app, n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                timing = server_timing(stats, time.perf_counter() - started)
+                headers.append((b"server-timing", timing.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            route = _route_path(scope)
+            repeated = []
+            if self.n_plus_one_threshold > 0:
+                repeated = stats.repeated_statements(self.n_plus_one_threshold)
+                for statement, count in repeated:
+                    logger.warning(
+                        "Possible N+1 in %s %s: statement ran %d times: %s",
+                        scope["method"], route, count, " ".join(statement.split())[:300]
+                    )
+            if stats.slowest_statement is not None:
+                logger.debug(
+                    "%s %s: %d queries, %.1f ms in the database, slowest %.1f ms: %s",
+                    scope["method"], route, stats.queries, stats.db_seconds * 1000,
+                    stats.slowest_seconds * 1000, " ".join(stats.slowest_statement.split())[:300]
+                )
+            route_metrics.observe(scope["method"], route, time.perf_counter() - started, stats, len(repeated))
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _histogram_lines(name: str, histogram: Histogram, **labels) -> List[str]:
+    snapshot = histogram.snapshot()
+    lines = [
+        f"{name}_bucket{_labels(**labels, le=bound)} {count}"
+        for bound, count in snapshot["buckets"]
+    ]
+    lines.append(f"{name}_sum{_labels(**labels)} {snapshot['sum']}")
+    lines.append(f"{name}_count{_labels(**labels)} {snapshot['count']}")
+    return lines
+
+def render_prometheus(engines: Dict[str, object], limiters: Sequence = ()) -> str:
+    """Route, pool and admission metrics in the Prometheus text exposition format"""
+    lines = [
+        "# HELP profitdesk_http_request_duration_seconds Request latency per route",
+        "# TYPE profitdesk_http_request_duration_seconds histogram",
+    ]
+    items = route_metrics.items()
+    for (method, route), latency, _, _, _ in items:
+        lines += _histogram_lines("profitdesk_http_request_duration_seconds", latency, method=method, route=route)
+    lines += [
+        "# HELP profitdesk_db_time_seconds Database time per request, per route",
+        "# TYPE profitdesk_db_time_seconds histogram",
+    ]
+    for (method, route), _, db_seconds, _, _ in items:
+        lines += _histogram_lines("profitdesk_db_time_seconds", db_seconds, method=method, route=route)
+    lines += [
+        "# HELP profitdesk_db_queries_total Queries run per route",
+        "# TYPE profitdesk_db_queries_total counter",
+    ]
+    lines += [
+        f"profitdesk_db_queries_total{_labels(method=method, route=route)} {queries}"
+        for (method, route), _, _, queries, _ in items
+    ]
+    lines += [
+        "# HELP profitdesk_n_plus_one_total Statements repeated above N_PLUS_ONE_THRESHOLD per route",
+        "# TYPE profitdesk_n_plus_one_total counter",
+    ]
+    lines += [
+        f"profitdesk_n_plus_one_total{_labels(method=method, route=route)} {count}"
+        for (method, route), _, _, _, count in items
+    ]
+
+    lines += [
+        "# HELP profitdesk_db_pool_checked_out Connections currently checked out",
+        "# TYPE profitdesk_db_pool_checked_out gauge",
+    ]
+    pools = {name: pool_stats(engine) for name, engine in engines.items()}
+    lines += [
+        f"profitdesk_db_pool_checked_out{_labels(pool=name)} {stats['checked_out']}"
+        for name, stats in pools.items() if "checked_out" in stats
+    ]
+    lines += [
+        "# HELP profitdesk_db_pool_wait_seconds Time waiting for a pooled connection",
+        "# TYPE profitdesk_db_pool_wait_seconds histogram",
+    ]
+    for name, engine in engines.items():
+        histogram = pool_wait_seconds.get(getattr(engine.pool, "metrics_name", name))
+        if histogram is not None:
+            lines += _histogram_lines("profitdesk_db_pool_wait_seconds", histogram, pool=name)
+    for stat, kind, help_text in (
+        ("running", "gauge", "Operations holding an admission slot"),
+        ("waiting", "gauge", "Operations queued for an admission slot"),
+        ("rejected", "counter", "Operations rejected with 503 by admission control"),
+    ):
+        name = f"profitdesk_admission_{stat}" + ("_total" if kind == "counter" else "")
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        lines += [f"{name}{_labels(limiter=limiter.name)} {limiter.stats()[stat]}" for limiter in limiters]
+    lines += [
+        "# HELP profitdesk_startup_seconds Cold-start time of this process, per phase",
+        "# TYPE profitdesk_startup_seconds gauge",
+    ]
+    lines += [
+        f"profitdesk_startup_seconds{_labels(phase=phase)} {seconds}"
+        for phase, seconds in startup_seconds.items()
+    ]
+    return "\n".join(lines) + "\n"
@@ -1,8 +1,19 @@
-from sqlalchemy import Column, Integer, String, Numeric, Date, ForeignKey, CheckConstraint, TIMESTAMP, Text
+from sqlalchemy import BigInteger, Column, Integer, String, Numeric, Date, ForeignKey, CheckConstraint, TIMESTAMP, Text, Index, JSON
+from sqlalchemy import column, select, table
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
+# data_versions as the synced tables' column defaults read it (see DataVersion)
+_data_versions = table("data_versions", column("name"), column("version"))
+
+def change_seq_of(table_name: str):
+    """The table's change counter as the current transaction sees it, which
+    rows written after app.sync.record_change bumped it take as change_seq"""
+    return select(func.coalesce(func.max(_data_versions.c.version), 0)).where(
+        _data_versions.c.name == table_name
+    ).scalar_subquery()
+
 class User(Base):
     __tablename__ = "users"
     
@@ -10,6 +21,7 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     password_hash = Column(String, nullable=False)
     role = Column(String, nullable=False)  # 'admin' or 'employee'
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")  # bump to revoke tokens
     created_at = Column(TIMESTAMP, server_default=func.now())
     
     employee = relationship("Employee", back_populates="user", uselist=False)
@@ -23,9 +35,18 @@ class Employee(Base):
     hours_per_month = Column(Integer, default=160)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now())
+    change_seq = Column(
+        BigInteger, nullable=False, server_default="0",
+        default=change_seq_of("employees"), onupdate=change_seq_of("employees")
+    )
     
     user = relationship("User", back_populates="employee")
     time_entries = relationship("TimeEntry", back_populates="employee")
+    
+    __table_args__ = (
+        Index("idx_employees_change_seq", "change_seq"),
+    )
 
 class Project(Base):
     __tablename__ = "projects"
@@ -35,8 +56,17 @@ class Project(Base):
     price_type = Column(String, nullable=False)  # 'fixed' or 'hourly'
     price_value = Column(Numeric(12, 2), nullable=False)
     created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now())
+    change_seq = Column(
+        BigInteger, nullable=False, server_default="0",
+        default=change_seq_of("projects"), onupdate=change_seq_of("projects")
+    )
     
     time_entries = relationship("TimeEntry", back_populates="project")
+    
+    __table_args__ = (
+        Index("idx_projects_change_seq", "change_seq"),
+    )
 
 class TimeEntry(Base):
     __tablename__ = "time_entries"
@@ -48,7 +78,74 @@ class TimeEntry(Base):
     hours = Column(Numeric(5, 2), nullable=False)
     note = Column(Text, nullable=True)
     created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now())
+    change_seq = Column(
+        BigInteger, nullable=False, server_default="0",
+        default=change_seq_of("time_entries"), onupdate=change_seq_of("time_entries")
+    )
     
     employee = relationship("Employee", back_populates="time_entries")
     project = relationship("Project", back_populates="time_entries")
+    
+    # Composite indexes for month-range report queries; on PostgreSQL the
+    # INCLUDE columns let the grouped report queries run as index-only scans
+    __table_args__ = (
+        Index(
+            "idx_time_entries_project_date",
+            "project_id", "entry_date",
+            postgresql_include=["employee_id", "hours"]
+        ),
+        Index(
+            "idx_time_entries_employee_date",
+            "employee_id", "entry_date",
+            postgresql_include=["project_id", "hours"]
+        ),
+        Index("idx_time_entries_change_seq", "change_seq"),
+    )
+
+class MonthlyRollup(Base):
+    __tablename__ = "monthly_rollups"
+    
+    # Hours per employee, project and month, maintained by app.rollups
+    employee_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    month = Column(Date, primary_key=True)  # first day of the month
+    hours = Column(Numeric(12, 2), nullable=False, default=0)
+    
+    __table_args__ = (
+        Index("idx_monthly_rollups_month", "month"),
+    )
+
+class MonthSnapshot(Base):
+    __tablename__ = "month_snapshots"
+    
+    # Reports of a closed month, frozen by app.month_close; Decimals are stored as strings
+    month = Column(Date, primary_key=True)  # first day of the month
+    closed_at = Column(TIMESTAMP, server_default=func.now())
+    closed_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    summary = Column(JSON, nullable=False)
+    projects = Column(JSON, nullable=False)  # project id -> project report
+    employees = Column(JSON, nullable=False)  # employee id -> employee report
+    cost_rates = Column(JSON, nullable=False)  # employee id -> monthly_cost, hours_per_month, hourly_cost
 
+class Tombstone(Base):
+    __tablename__ = "tombstones"
+    
+    # Rows deleted from the synced tables, so /sync can tell clients to drop them
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    deleted_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+    change_seq = Column(BigInteger, nullable=False, server_default="0")  # see app.sync.record_tombstone
+    
+    __table_args__ = (
+        Index("idx_tombstones_deleted_at", "deleted_at"),
+        Index("idx_tombstones_change_seq", "table_name", "change_seq"),
+    )
+
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+    
+    # Change counters bumped in the transaction of every write (see app.versions)
+    name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,153 @@
+from decimal import Decimal
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Set
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from app import models, schemas
+from app.calculations import calculate_hourly_cost
+from app.report_cache import report_cache
+from app.report_engine import build_month_reports, get_month_hours
+from app.rollups import month_start
+
+# Campos numéricos de los informes, guardados como texto para no perder precisión
+_DECIMAL_FIELDS = {
+    "total_profit", "hours", "cost", "revenue", "margin", "monthly_cost",
+    "revenue_attributed", "price_value", "percentage", "hourly_cost",
+}
+
+class MonthClosedError(Exception):
+    """Escritura sobre un mes cerrado"""
+
+    def __init__(self, month: date):
+        self.month = month
+        super().__init__(f"Month {month:%Y-%m} is closed")
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return _dump(value.model_dump())
+    if isinstance(value, dict):
+        return {str(key): _dump(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_dump(item) for item in value]
+    return value
+
+def _load(value: Any, key: Optional[str] = None) -> Any:
+    if isinstance(value, dict):
+        return {k: _load(item, k) for k, item in value.items()}
+    if isinstance(value, list):
+        return [_load(item, key) for item in value]
+    if isinstance(value, str) and key in _DECIMAL_FIELDS:
+        return Decimal(value)
+    return value
+
+def get_snapshot(db: Session, year: int, month: int) -> Optional[models.MonthSnapshot]:
+    return db.get(models.MonthSnapshot, date(year, month, 1))
+
+def closed_months(db: Session, days: Iterable[date]) -> Set[date]:
+    """Primer día de los meses cerrados entre los de days"""
+    months = {month_start(day) for day in days}
+    if not months:
+        return set()
+    return {
+        month for (month,) in
+        db.query(models.MonthSnapshot.month).filter(models.MonthSnapshot.month.in_(months))
+    }
+
+def lock_months(db: Session, days: Iterable[date]) -> None:
+    """Bloquea los meses de days hasta el final de la transacción.
+
+    Incrementa su versión de informes (una fila de data_versions por mes), lo
+    que además invalida sus informes en caché. Las escrituras de entradas de
+    tiempo la toman antes de comprobar que el mes está abierto y close_month
+    antes de calcular, así que una escritura no puede colarse en un mes
+    mientras se cierra: la segunda espera a que la primera termine.
+    """
+    report_cache.invalidate(db, {(day.year, day.month) for day in days})
+
+def ensure_months_open(db: Session, *days: date) -> None:
+    """Bloquea los meses de las fechas (ver lock_months) y lanza MonthClosedError si alguno está cerrado"""
+    lock_months(db, days)
+    closed = closed_months(db, days)
+    if closed:
+        raise MonthClosedError(min(closed))
+
+def close_month(db: Session, year: int, month: int, user_id: Optional[int] = None) -> models.MonthSnapshot:
+    """Calcula y guarda los informes del mes con los costes vigentes. No hace commit.
+
+    Bloquea antes el mes (ver lock_months) y lanza MonthClosedError si ya
+    estaba cerrado; después hace tres consultas de lectura sea cual sea el
+    número de proyectos y empleados (ver build_month_reports).
+    """
+    ensure_months_open(db, date(year, month, 1))
+    employees = db.query(models.Employee).order_by(models.Employee.id).all()
+    projects = db.query(models.Project).order_by(models.Project.id).all()
+    summary, project_reports, employee_reports = build_month_reports(
+        projects, employees, get_month_hours(db, year, month), year, month
+    )
+    snapshot = models.MonthSnapshot(
+        month=date(year, month, 1),
+        closed_by=user_id,
+        summary=_dump(summary),
+        projects={str(project_id): _dump(report) for project_id, report in project_reports.items()},
+        employees={str(employee_id): _dump(report) for employee_id, report in employee_reports.items()},
+        cost_rates={
+            str(employee.id): _dump({
+                "monthly_cost": employee.monthly_cost,
+                "hours_per_month": employee.hours_per_month,
+                "hourly_cost": calculate_hourly_cost(employee.monthly_cost, employee.hours_per_month)
+            })
+            for employee in employees
+        }
+    )
+    db.add(snapshot)
+    db.flush()
+    return snapshot
+
+def reopen_month(db: Session, year: int, month: int) -> bool:
+    """Borra la foto del mes; devuelve False si no estaba cerrado. No hace commit."""
+    snapshot = get_snapshot(db, year, month)
+    if snapshot is None:
+        return False
+    db.delete(snapshot)
+    db.flush()
+    return True
+
+def snapshot_summary(snapshot: models.MonthSnapshot) -> dict:
+    """Resumen guardado, con la misma forma que generate_summary_report_data"""
+    return {
+        "total_profit": Decimal(snapshot.summary["total_profit"]),
+        "projects": [schemas.ProjectReport(**report) for report in snapshot.summary["projects"]],
+        "employees": [schemas.EmployeeReport(**report) for report in snapshot.summary["employees"]]
+    }
+
+def snapshot_employee_report(snapshot: models.MonthSnapshot, employee_id: int) -> Optional[dict]:
+    """Informe guardado de un empleado, o None si no existía al cerrar el mes"""
+    report = snapshot.employees.get(str(employee_id))
+    return _load(report) if report is not None else None
+
+def snapshot_project_report(snapshot: models.MonthSnapshot, project_id: int) -> Optional[dict]:
+    """Informe guardado de un proyecto, o None si no existía al cerrar el mes"""
+    report = snapshot.projects.get(str(project_id))
+    return _load(report) if report is not None else None
+
+def snapshot_hourly_costs(snapshot: models.MonthSnapshot) -> Dict[int, Decimal]:
+    """Coste por hora de cada empleado en el momento del cierre"""
+    return {int(employee_id): Decimal(rates["hourly_cost"]) for employee_id, rates in snapshot.cost_rates.items()}
+
+def closed_summaries(db: Session, first_month: date, last_month: date) -> Dict[date, dict]:
+    """Resúmenes guardados de los meses cerrados de un rango, ambos incluidos"""
+    snapshots = db.query(models.MonthSnapshot).filter(
+        models.MonthSnapshot.month >= month_start(first_month),
+        models.MonthSnapshot.month <= month_start(last_month)
+    )
+    return {snapshot.month: snapshot_summary(snapshot) for snapshot in snapshots}
+
+def list_closed_months(db: Session) -> list:
+    """(month, closed_at, closed_by) de cada mes cerrado, sin cargar los informes"""
+    return db.query(
+        models.MonthSnapshot.month,
+        models.MonthSnapshot.closed_at,
+        models.MonthSnapshot.closed_by
+    ).order_by(models.MonthSnapshot.month).all()
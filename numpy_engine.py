@@ -0,0 +1,299 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Callable, Dict, Iterable, List, Optional
+import argparse
+import random
+import sys
+import numpy as np
+from app import models, schemas
+from app.calculations import (
+    calculate_hourly_cost,
+    calculate_project_margin,
+    get_project_status,
+    calculate_employee_margin,
+    get_employee_status
+)
+
+CENT = Decimal("0.01")
+# Distancia a medio céntimo por debajo de la cual un importe float64 se
+# recalcula con Decimal: un empate exacto (0,375) puede quedar en 0,37499999...
+TIE_TOLERANCE = 1e-6
+
+def to_cents(value) -> Decimal:
+    """Redondea un valor (float o Decimal) al céntimo, con medios hacia arriba"""
+    return Decimal(value if isinstance(value, Decimal) else float(value)).quantize(CENT, ROUND_HALF_UP)
+
+def _cents(value: float, exact: Callable[[], Decimal]) -> Decimal:
+    """to_cents de un float, salvo cerca de medio céntimo, donde redondea exact()"""
+    if abs(abs(value) * 100 % 1 - 0.5) < TIE_TOLERANCE * 100:
+        return to_cents(exact())
+    return to_cents(value)
+
+class _ExactAmounts:
+    """Importes de report_engine con Decimal, en el mismo orden de operaciones.
+
+    Sólo se usan para los pocos importes que caen cerca de medio céntimo.
+    """
+
+    def __init__(self, projects: List[models.Project], employees: List[models.Employee], rows: List):
+        self.projects = {project.id: project for project in projects}
+        self.rows = [(project_id, employee_id, hours or Decimal(0)) for project_id, employee_id, hours in rows]
+        self.hourly_costs = {
+            employee.id: calculate_hourly_cost(employee.monthly_cost, employee.hours_per_month)
+            for employee in employees
+        }
+        self._hours: Dict[int, Decimal] = {}
+
+    def project_hours(self, project_id: int) -> Decimal:
+        if project_id not in self._hours:
+            self._hours[project_id] = sum(
+                (hours for row_project, _, hours in self.rows if row_project == project_id), Decimal(0)
+            )
+        return self._hours[project_id]
+
+    def project_cost(self, project_id: int) -> Decimal:
+        return sum(
+            (hours * self.hourly_costs.get(employee_id, Decimal(0))
+             for row_project, employee_id, hours in self.rows if row_project == project_id),
+            Decimal(0)
+        )
+
+    def project_revenue(self, project_id: int) -> Decimal:
+        project = self.projects[project_id]
+        if project.price_type == "fixed":
+            return project.price_value
+        return self.project_hours(project_id) * project.price_value
+
+    def revenue_attributed(self, employee_id: int) -> Decimal:
+        revenue = Decimal(0)
+        for project_id, row_employee, hours in self.rows:
+            if row_employee != employee_id or project_id not in self.projects:
+                continue
+            total_hours = self.project_hours(project_id)
+            if total_hours > 0:
+                revenue += self.project_revenue(project_id) * (hours / total_hours)
+        return revenue
+
+def build_summary_report_data(
+    projects: Iterable[models.Project],
+    employees: Iterable[models.Employee],
+    hours_rows: Iterable
+) -> dict:
+    """Versión vectorizada de report_engine.build_summary_report_data.
+
+    Carga las horas en columnas (proyecto, empleado, horas), calcula el coste
+    por hora como un array indexado por empleado y agrupa con bincount. Los
+    importes se calculan en float64 y se devuelven redondeados al céntimo;
+    los que quedan a menos de TIE_TOLERANCE de medio céntimo se recalculan
+    con Decimal para redondear igual que round_summary.
+    """
+    projects = list(projects)
+    employees = list(employees)
+    rows = list(hours_rows)
+
+    # Un índice extra al final recoge ids desconocidos (sin coste ni ingresos)
+    project_index = {project.id: i for i, project in enumerate(projects)}
+    employee_index = {employee.id: i for i, employee in enumerate(employees)}
+    n_projects, n_employees = len(projects), len(employees)
+
+    row_projects = np.fromiter(
+        (project_index.get(project_id, n_projects) for project_id, _, _ in rows), dtype=np.intp, count=len(rows)
+    )
+    row_employees = np.fromiter(
+        (employee_index.get(employee_id, n_employees) for _, employee_id, _ in rows), dtype=np.intp, count=len(rows)
+    )
+    row_hours = np.fromiter((float(hours or 0) for _, _, hours in rows), dtype=np.float64, count=len(rows))
+
+    monthly_costs = np.array([float(e.monthly_cost) for e in employees] + [0.0])
+    hours_per_month = np.array([e.hours_per_month for e in employees] + [0], dtype=np.float64)
+    hourly_costs = np.divide(
+        monthly_costs, hours_per_month, out=np.zeros_like(monthly_costs), where=hours_per_month != 0
+    )
+
+    project_hours = np.bincount(row_projects, weights=row_hours, minlength=n_projects + 1)
+    project_costs = np.bincount(
+        row_projects, weights=row_hours * hourly_costs[row_employees], minlength=n_projects + 1
+    )
+    price_values = np.array([float(p.price_value) for p in projects] + [0.0])
+    is_fixed = np.array([p.price_type == "fixed" for p in projects] + [False])
+    project_revenues = np.where(is_fixed, price_values, project_hours * price_values)
+    project_revenues[n_projects] = 0.0
+
+    # Reparto de ingresos proporcional a las horas de cada empleado en cada proyecto
+    row_project_hours = project_hours[row_projects]
+    shares = np.divide(row_hours, row_project_hours, out=np.zeros_like(row_hours), where=row_project_hours > 0)
+    revenue_attributed = np.bincount(
+        row_employees, weights=project_revenues[row_projects] * shares, minlength=n_employees + 1
+    )
+
+    exact = _ExactAmounts(projects, employees, rows)
+    project_reports = []
+    for i, project in enumerate(projects):
+        if project.price_type == "fixed":
+            revenue = project.price_value
+        else:
+            revenue = _cents(project_revenues[i], lambda: exact.project_revenue(project.id))
+        cost = _cents(project_costs[i], lambda: exact.project_cost(project.id))
+        margin = calculate_project_margin(revenue, cost)
+        project_reports.append(schemas.ProjectReport(
+            id=project.id,
+            name=project.name,
+            hours=to_cents(project_hours[i]),
+            cost=cost,
+            revenue=revenue,
+            margin=margin,
+            status=get_project_status(margin, revenue)
+        ))
+
+    employee_reports = []
+    for i, employee in enumerate(employees):
+        revenue = _cents(revenue_attributed[i], lambda: exact.revenue_attributed(employee.id))
+        margin = calculate_employee_margin(revenue, employee.monthly_cost)
+        employee_reports.append(schemas.EmployeeReport(
+            id=employee.id,
+            name=employee.name,
+            monthly_cost=employee.monthly_cost,
+            revenue_attributed=revenue,
+            margin=margin,
+            status=get_employee_status(margin, employee.monthly_cost)
+        ))
+
+    return {
+        "total_profit": sum((report.margin for report in project_reports), Decimal(0)),
+        "projects": project_reports,
+        "employees": employee_reports
+    }
+
+def round_summary(summary: dict) -> dict:
+    """Redondea un resumen del motor Decimal como lo hace el motor numpy.
+
+    Horas, costes e ingresos van al céntimo; márgenes, estados y el beneficio
+    total se recalculan a partir de los importes redondeados.
+    """
+    project_reports = []
+    for report in summary["projects"]:
+        revenue = to_cents(report.revenue)
+        cost = to_cents(report.cost)
+        margin = calculate_project_margin(revenue, cost)
+        project_reports.append(report.model_copy(update={
+            "hours": to_cents(report.hours),
+            "cost": cost,
+            "revenue": revenue,
+            "margin": margin,
+            "status": get_project_status(margin, revenue)
+        }))
+    employee_reports = []
+    for report in summary["employees"]:
+        revenue = to_cents(report.revenue_attributed)
+        margin = calculate_employee_margin(revenue, report.monthly_cost)
+        employee_reports.append(report.model_copy(update={
+            "revenue_attributed": revenue,
+            "margin": margin,
+            "status": get_employee_status(margin, report.monthly_cost)
+        }))
+    return {
+        "total_profit": sum((report.margin for report in project_reports), Decimal(0)),
+        "projects": project_reports,
+        "employees": employee_reports
+    }
+
+def compare_summaries(expected: dict, actual: dict) -> List[str]:
+    """Diferencias entre el resumen del motor Decimal (expected) y el del motor numpy (actual).
+
+    expected se redondea con round_summary, así que ambos deben coincidir
+    exactamente, estados y beneficio total incluidos.
+    """
+    expected = round_summary(expected)
+    problems = []
+    for kind, fields in (
+        ("projects", ("hours", "cost", "revenue", "margin", "status")),
+        ("employees", ("revenue_attributed", "margin", "status")),
+    ):
+        actual_items = {item.id: item for item in actual[kind]}
+        for item in expected[kind]:
+            other = actual_items.get(item.id)
+            if other is None:
+                problems.append(f"{kind} {item.id}: missing")
+                continue
+            for field in fields:
+                if getattr(item, field) != getattr(other, field):
+                    problems.append(f"{kind} {item.id} {field}: {getattr(item, field)} != {getattr(other, field)}")
+    if expected["total_profit"] != actual["total_profit"]:
+        problems.append(f"total_profit: {expected['total_profit']} != {actual['total_profit']}")
+    return problems
+
+def random_dataset(seed: int, n_employees: int = 20, n_projects: int = 10, n_rows: int = 150):
+    """Empleados, proyectos y horas aleatorios (sin base de datos) para comparar motores"""
+    rnd = random.Random(seed)
+    employees = [
+        models.Employee(
+            id=i + 1,
+            name=f"Employee {i + 1}",
+            monthly_cost=Decimal(rnd.randint(0, 900000)) / 100,
+            hours_per_month=rnd.choice([0, 37, 80, 120, 160, 173])
+        )
+        for i in range(n_employees)
+    ]
+    projects = [
+        models.Project(
+            id=i + 1,
+            name=f"Project {i + 1}",
+            price_type=rnd.choice(["fixed", "hourly"]),
+            price_value=Decimal(rnd.randint(0, 5000000)) / 100
+        )
+        for i in range(n_projects)
+    ]
+    hours_rows = {}
+    for _ in range(n_rows):
+        key = (rnd.randint(1, n_projects), rnd.randint(1, n_employees))
+        hours_rows[key] = hours_rows.get(key, Decimal(0)) + Decimal(rnd.randint(1, 4000)) / 100
+    return projects, employees, [(p, e, h) for (p, e), h in hours_rows.items()]
+
+def verify_random(runs: int, seed: int = 0) -> List[str]:
+    """Compara ambos motores en runs conjuntos de datos aleatorios"""
+    from app.report_engine import build_summary_report_data as build_decimal
+
+    problems = []
+    for run in range(runs):
+        projects, employees, hours_rows = random_dataset(seed + run)
+        expected = build_decimal(projects, employees, hours_rows)
+        actual = build_summary_report_data(projects, employees, hours_rows)
+        problems.extend(f"seed={seed + run} {p}" for p in compare_summaries(expected, actual))
+    return problems
+
+def verify_month(db, year: int, month: int) -> List[str]:
+    """Compara ambos motores con los datos de un mes de la base de datos"""
+    from app.report_engine import build_summary_report_data as build_decimal
+    from app.rollups import get_month_rollup_hours
+
+    projects = db.query(models.Project).all()
+    employees = db.query(models.Employee).all()
+    hours_rows = get_month_rollup_hours(db, year, month)
+    return compare_summaries(
+        build_decimal(projects, employees, hours_rows),
+        build_summary_report_data(projects, employees, hours_rows)
+    )
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check that the numpy and Decimal report engines agree")
+    parser.add_argument("--random", type=int, default=0, help="Number of random datasets to compare")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--month", help="Also compare one month of the database (YYYY-MM)")
+    args = parser.parse_args(argv)
+
+    problems = verify_random(args.random, args.seed)
+    if args.month:
+        from app.database import SessionLocal
+
+        year, month_num = map(int, args.month.split("-"))
+        db = SessionLocal()
+        try:
+            problems.extend(verify_month(db, year, month_num))
+        finally:
+            db.close()
+    for problem in problems:
+        print(problem)
+    print(f"{len(problems)} differences found")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+from datetime import date
+from typing import List, Optional, Tuple
+import base64
+import json
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+from app import models
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: dict) -> str:
+    """Opaque, URL-safe cursor token for the last row of a page"""
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(token: str) -> dict:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, dict):
+            raise ValueError(token)
+        return values
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _take_page(query: Query, limit: int) -> Tuple[List, bool]:
+    # One extra row tells whether there is a next page without a COUNT
+    rows = query.limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+def paginate_by_id(query: Query, model, cursor: Optional[str], limit: int, response: Response) -> List:
+    """Keyset pagination on id ascending; sets the next cursor header if more rows remain"""
+    if cursor:
+        try:
+            last_id = int(decode_cursor(cursor)["id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(model.id > last_id)
+
+    rows, has_more = _take_page(query.order_by(model.id), limit)
+    if has_more:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({"id": rows[-1].id})
+    return rows
+
+def paginate_time_entries(query: Query, cursor: Optional[str], limit: int, response: Response) -> List:
+    """Keyset pagination on (entry_date, id) descending, the order the UI lists entries in"""
+    entry = models.TimeEntry
+    if cursor:
+        try:
+            values = decode_cursor(cursor)
+            last_date = date.fromisoformat(values["d"])
+            last_id = int(values["id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(or_(
+            entry.entry_date < last_date,
+            and_(entry.entry_date == last_date, entry.id < last_id)
+        ))
+
+    rows, has_more = _take_page(query.order_by(entry.entry_date.desc(), entry.id.desc()), limit)
+    if has_more:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({
+            "d": last.entry_date.isoformat(),
+            "id": last.id
+        })
+    return rows
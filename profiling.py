@@ -0,0 +1,222 @@
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs
+import json
+import os
+import sys
+import threading
+import time
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response
+
+# Header (or query parameter "profile") that asks for a profile of the request
+PROFILE_HEADER = b"x-profile"
+PROFILE_FORMATS = ("speedscope", "collapsed")
+# Seconds between samples
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.001"))
+# When set, profiles are written to this directory and the normal response is
+# returned with an X-Profile-File header; otherwise the profile is the response
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+
+Frame = Tuple[str, str, int]  # (function, file, first line)
+
+class SamplingProfiler:
+    """Samples the stacks of a set of threads from a background thread.
+
+    The request's event loop thread is sampled for its whole duration, and
+    threadpool workers while they run sync code for the request (see
+    call_profiled). Other requests sharing the event loop show up too.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.duration = 0.0
+        self._threads: Set[int] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def add_thread(self, thread_id: int) -> None:
+        with self._lock:
+            self._threads.add(thread_id)
+
+    def remove_thread(self, thread_id: int) -> None:
+        with self._lock:
+            self._threads.discard(thread_id)
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._sampler.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self._threads)
+            for thread_id in threads:
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                self.samples[tuple(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Collapsed stacks ("root;...;leaf count"), as read by flamegraph.pl and speedscope"""
+        lines = [
+            ";".join(f"{name} ({os.path.basename(path)}:{line})" for name, path, line in stack) + f" {count}"
+            for stack, count in self.samples.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str) -> dict:
+        """Profile in the speedscope file format (https://www.speedscope.app)"""
+        frame_index: Dict[Frame, int] = {}
+        frames: List[dict] = []
+        samples, weights = [], []
+        for stack, count in self.samples.items():
+            indexes = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indexes.append(frame_index[frame])
+            samples.append(indexes)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": name,
+            "exporter": "profitdesk",
+        }
+
+_active_profiler: ContextVar[Optional[SamplingProfiler]] = ContextVar("active_profiler", default=None)
+
+def call_profiled(fn: Callable, *args):
+    """Call fn(*args), sampling the current thread if the request is being profiled"""
+    profiler = _active_profiler.get()
+    if profiler is None:
+        return fn(*args)
+    thread_id = threading.get_ident()
+    profiler.add_thread(thread_id)
+    try:
+        return fn(*args)
+    finally:
+        profiler.remove_thread(thread_id)
+
+def _requested_format(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value.decode("latin-1").strip().lower() or "speedscope"
+    if b"profile" in scope["query_string"]:
+        values = parse_qs(scope["query_string"].decode("latin-1")).get("profile")
+        if values:
+            return values[0].strip().lower() or "speedscope"
+    return None
+
+async def _check_admin(scope) -> None:
+    # Imported here: app.database imports this module and app.auth imports app.database
+    from app.auth import get_current_admin_user, get_current_user
+
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    await get_current_admin_user(await get_current_user(token))
+
+class ProfilerMiddleware:
+    """Profiles requests that send X-Profile (or ?profile=), for admins only.
+
+    X-Profile: speedscope (default) or collapsed picks the format. Requests
+    without the header or parameter go straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        profile_format = _requested_format(scope) if scope["type"] == "http" else None
+        if profile_format is None:
+            await self.app(scope, receive, send)
+            return
+
+        if profile_format in ("1", "true"):
+            profile_format = "speedscope"
+        try:
+            if profile_format not in PROFILE_FORMATS:
+                raise HTTPException(status_code=400, detail=f"Profile format must be one of {', '.join(PROFILE_FORMATS)}")
+            await _check_admin(scope)
+        except HTTPException as error:
+            await JSONResponse({"detail": error.detail}, status_code=error.status_code, headers=error.headers)(
+                scope, receive, send
+            )
+            return
+
+        profiler = SamplingProfiler()
+        profiler.add_thread(threading.get_ident())
+        token = _active_profiler.set(profiler)
+        response_start = {}
+        body: List[bytes] = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response_start.update(message)
+            elif PROFILE_DIR:
+                body.append(message.get("body", b""))
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            profiler.stop()
+            _active_profiler.reset(token)
+
+        name = f"{scope['method']} {scope['path']}"
+        if profile_format == "collapsed":
+            content, media_type, extension = profiler.collapsed().encode(), "text/plain", "txt"
+        else:
+            content, media_type, extension = json.dumps(profiler.speedscope(name)).encode(), "application/json", "speedscope.json"
+        filename = (
+            f"profile-{datetime.now():%Y%m%d-%H%M%S-%f}-"
+            f"{scope['path'].strip('/').replace('/', '_') or 'root'}.{extension}"
+        )
+
+        if PROFILE_DIR:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            with open(os.path.join(PROFILE_DIR, filename), "wb") as output:
+                output.write(content)
+            headers = list(response_start.get("headers", [])) + [(b"x-profile-file", filename.encode())]
+            await send({**response_start, "headers": headers})
+            await send({"type": "http.response.body", "body": b"".join(body)})
+            return
+
+        await Response(
+            content,
+            media_type=media_type,
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"',
+                "X-Profiled-Status": str(response_start.get("status", "")),
+            },
+        )(scope, receive, send)
@@ -0,0 +1,201 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+import asyncio
+import os
+import threading
+import weakref
+from sqlalchemy.orm import Session
+from app.versions import bump_versions, read_versions
+
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "256"))
+
+_MISSING = object()
+
+class CacheBackend:
+    """Storage of the reports cached by ReportCache.
+
+    The data versions in the keys live in the database, so every worker agrees
+    on them; a backend shared between workers (e.g. Redis) only shares values.
+    """
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value or None"""
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: Any) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+class LRUCacheBackend(CacheBackend):
+    """In-process LRU cache limited to max_entries values"""
+
+    def __init__(self, max_entries: int = REPORT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._values: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            value = self._values.get(key, _MISSING)
+            if value is _MISSING:
+                return None
+            self._values.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+class SingleFlight:
+    """Coalesces concurrent async computations of the same key.
+
+    The first caller runs compute; callers arriving while it runs await its
+    result (or its exception) instead of computing again. If the first
+    caller is cancelled, a waiting caller takes over. Per event loop.
+    """
+
+    def __init__(self):
+        self._flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Future]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _loop_flights(self) -> Dict[Hashable, asyncio.Future]:
+        loop = asyncio.get_running_loop()
+        flights = self._flights.get(loop)
+        if flights is None:
+            flights = self._flights[loop] = {}
+        return flights
+
+    def in_flight(self) -> int:
+        return sum(len(flights) for flights in self._flights.values())
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        flights = self._loop_flights()
+        while key in flights:
+            flight = flights[key]
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise
+
+        flight = asyncio.get_running_loop().create_future()
+        flights[key] = flight
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as exc:
+            flight.set_exception(exc)
+            # Marks the exception as retrieved when nobody was waiting
+            flight.exception()
+            raise
+        else:
+            flight.set_result(value)
+            return value
+        finally:
+            del flights[key]
+
+MonthKey = Tuple[int, int]
+
+# data_versions counter of writes that affect every month (employees, projects)
+ALL_MONTHS_VERSION = "reports"
+
+def month_version(month: MonthKey) -> str:
+    """data_versions counter of the writes that affect one month"""
+    year, month_num = month
+    return f"reports:{year}-{month_num:02d}"
+
+class ReportCache:
+    """Cache of computed reports keyed by report type, month and id.
+
+    Writes do not delete entries: in their own transaction they bump the data
+    version of the affected months (see app.versions), which is part of every
+    cache key and ETag, so stale entries are simply never read again and age
+    out of the LRU. The versions are read from the database, so a write
+    served by one worker invalidates the reports cached by all of them.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.backend = backend or LRUCacheBackend()
+        self.single_flight = SingleFlight()
+
+    def data_version(self, db: Session, month: MonthKey) -> str:
+        """Version of the month's data, read before computing a report from db"""
+        versions = read_versions(db, ALL_MONTHS_VERSION, month_version(month))
+        return f"{versions[ALL_MONTHS_VERSION]}.{versions[month_version(month)]}"
+
+    def etag(self, report_type: str, month: MonthKey, report_id: Optional[int], version: str) -> str:
+        year, month_num = month
+        return f'"{report_type}-{year}-{month_num:02d}-{report_id or 0}-{version}"'
+
+    async def get_or_compute_async(
+        self,
+        report_type: str,
+        month: MonthKey,
+        report_id: Optional[int],
+        version: str,
+        compute: Callable[[], Awaitable[Any]],
+        store: bool = True
+    ) -> Any:
+        """The cached report, or the result of awaiting compute() stored in the cache.
+
+        version comes from data_version, read before computing: if a write
+        lands meanwhile the result is stored under the old version and never
+        served. Concurrent misses of the same key in this process share one
+        compute. store=False serves a miss without caching it, e.g. when it
+        was read from a replica that may still lag behind the latest write;
+        such computations are only shared with each other.
+        """
+        key = (report_type, month, report_id, version)
+        value = self.backend.get(key)
+        if value is not None:
+            return value
+
+        async def compute_and_store():
+            value = await compute()
+            if store:
+                self.backend.set(key, value)
+            return value
+
+        return await self.single_flight.run((key, store), compute_and_store)
+
+    def versions_written(self, months: Optional[Iterable[MonthKey]] = None) -> List[str]:
+        """data_versions counters to bump for a write to months, or to every month if None"""
+        if months is None:
+            return [ALL_MONTHS_VERSION]
+        return [month_version(month) for month in months]
+
+    def invalidate(self, db: Session, months: Optional[Iterable[MonthKey]] = None) -> None:
+        """Bump the version of months (every month if None) in the current
+        transaction, locking them until it ends (see app.versions); writes
+        that also bump a list counter pass versions_written to
+        app.sync.record_change instead."""
+        bump_versions(db, *self.versions_written(months))
+
+    def set_backend(self, backend: CacheBackend) -> None:
+        self.backend = backend
+
+report_cache = ReportCache()
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
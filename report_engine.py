@@ -0,0 +1,467 @@
+from decimal import Decimal
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import os
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app import models, schemas
+from app.calculations import (
+    get_month_range,
+    month_filter,
+    calculate_hourly_cost,
+    calculate_project_margin,
+    get_project_status,
+    calculate_employee_revenue_attributed,
+    calculate_employee_margin,
+    get_employee_status
+)
+from app.rollups import get_month_rollup_hours, get_rollup_hours_between
+
+# (project_id, employee_id, horas) agregadas para un mes
+HoursRow = Tuple[int, int, Decimal]
+
+# Motor de cálculo de los resúmenes: "decimal" (exacto) o "numpy" (vectorizado,
+# redondeado al céntimo; ver numpy_engine.py)
+REPORT_ENGINE = os.getenv("REPORT_ENGINE", "decimal")
+
+TREND_GROUPS = ("project", "employee", "total")
+# Meses como máximo en una tendencia
+TREND_MAX_MONTHS = 60
+
+# Periodos de la serie de horas y coste de un proyecto
+PROJECT_SERIES_GRANULARITIES = ("day", "week")
+
+def build_summary_report_data(
+    projects: Iterable[models.Project],
+    employees: Iterable[models.Employee],
+    hours_rows: Iterable[HoursRow]
+) -> dict:
+    """Construye el resumen del mes en memoria a partir de las horas agrupadas.
+
+    Aplica las mismas reglas que calculations.py: coste por hora del empleado,
+    ingresos fijos u horarios del proyecto y reparto de ingresos proporcional
+    a las horas de cada empleado en cada proyecto.
+    """
+    employees = list(employees)
+    hourly_costs = {
+        employee.id: calculate_hourly_cost(employee.monthly_cost, employee.hours_per_month)
+        for employee in employees
+    }
+
+    project_hours: Dict[int, Decimal] = defaultdict(Decimal)
+    project_costs: Dict[int, Decimal] = defaultdict(Decimal)
+    hours_by_employee: Dict[int, List[Tuple[int, Decimal]]] = defaultdict(list)
+    for project_id, employee_id, hours in hours_rows:
+        hours = hours or Decimal(0)
+        project_hours[project_id] += hours
+        project_costs[project_id] += hours * hourly_costs.get(employee_id, Decimal(0))
+        hours_by_employee[employee_id].append((project_id, hours))
+
+    project_reports = []
+    project_revenues: Dict[int, Decimal] = {}
+    for project in projects:
+        total_hours = project_hours.get(project.id, Decimal(0))
+        cost = project_costs.get(project.id, Decimal(0))
+        if project.price_type == "fixed":
+            revenue = project.price_value
+        else:  # hourly
+            revenue = total_hours * project.price_value
+        project_revenues[project.id] = revenue
+        margin = calculate_project_margin(revenue, cost)
+        status = get_project_status(margin, revenue)
+
+        project_reports.append(schemas.ProjectReport(
+            id=project.id,
+            name=project.name,
+            hours=total_hours,
+            cost=cost,
+            revenue=revenue,
+            margin=margin,
+            status=status
+        ))
+
+    employee_reports = []
+    for employee in employees:
+        revenue_attributed = Decimal(0)
+        for project_id, hours in hours_by_employee.get(employee.id, []):
+            project_total_hours = project_hours[project_id]
+            if project_total_hours > 0 and project_id in project_revenues:
+                employee_share = hours / project_total_hours
+                revenue_attributed += project_revenues[project_id] * employee_share
+        margin = calculate_employee_margin(revenue_attributed, employee.monthly_cost)
+        status = get_employee_status(margin, employee.monthly_cost)
+
+        employee_reports.append(schemas.EmployeeReport(
+            id=employee.id,
+            name=employee.name,
+            monthly_cost=employee.monthly_cost,
+            revenue_attributed=revenue_attributed,
+            margin=margin,
+            status=status
+        ))
+
+    total_profit = sum(pr.margin for pr in project_reports)
+
+    return {
+        "total_profit": total_profit,
+        "projects": project_reports,
+        "employees": employee_reports
+    }
+
+def get_summary_builder(engine: str = REPORT_ENGINE) -> Callable[..., dict]:
+    """Función que construye el resumen según el motor configurado"""
+    if engine == "decimal":
+        return build_summary_report_data
+    if engine == "numpy":
+        # numpy sólo se importa si se usa este motor
+        from app import numpy_engine
+        return numpy_engine.build_summary_report_data
+    raise ValueError(f"Unknown REPORT_ENGINE: {engine}")
+
+def generate_summary_report_data(db: Session, year: int, month: int) -> dict:
+    """Genera el resumen del mes con un número fijo de consultas (proyectos, empleados y acumulado mensual)"""
+    projects = db.query(models.Project).all()
+    employees = db.query(models.Employee).all()
+    hours_rows = get_month_rollup_hours(db, year, month)
+    return get_summary_builder()(projects, employees, hours_rows)
+
+def build_employee_report_data(
+    employee: models.Employee,
+    revenue_attributed: Decimal,
+    year: int,
+    month_num: int
+) -> dict:
+    """Informe de un empleado a partir de sus ingresos atribuidos en el mes"""
+    margin = calculate_employee_margin(revenue_attributed, employee.monthly_cost)
+    status = get_employee_status(margin, employee.monthly_cost)
+
+    return {
+        "employee": {
+            "id": employee.id,
+            "name": employee.name,
+            "monthly_cost": employee.monthly_cost,
+            "hours_per_month": employee.hours_per_month
+        },
+        "month": f"{year}-{month_num:02d}",
+        "revenue_attributed": revenue_attributed,
+        "margin": margin,
+        "status": status
+    }
+
+def generate_employee_report_data(db: Session, employee_id: int, year: int, month_num: int) -> Optional[dict]:
+    """Informe de un empleado en un mes, o None si el empleado no existe"""
+    employee = db.query(models.Employee).filter(models.Employee.id == employee_id).first()
+    if not employee:
+        return None
+
+    revenue_attributed = calculate_employee_revenue_attributed(
+        db, employee_id, year, month_num
+    )
+    return build_employee_report_data(employee, revenue_attributed, year, month_num)
+
+def project_breakdown_rows(db: Session, project_id: int, year: int, month_num: int) -> list:
+    """(employee_id, nombre, coste mensual, horas al mes, horas) de cada empleado del proyecto en el mes"""
+    return db.query(
+        models.Employee.id,
+        models.Employee.name,
+        models.Employee.monthly_cost,
+        models.Employee.hours_per_month,
+        func.sum(models.TimeEntry.hours)
+    ).join(
+        models.TimeEntry, models.TimeEntry.employee_id == models.Employee.id
+    ).filter(
+        models.TimeEntry.project_id == project_id,
+        month_filter(year, month_num)
+    ).group_by(
+        models.Employee.id,
+        models.Employee.name,
+        models.Employee.monthly_cost,
+        models.Employee.hours_per_month
+    ).order_by(models.Employee.id).all()
+
+def _period_start(day: date, granularity: str) -> date:
+    return day - timedelta(days=day.weekday()) if granularity == "week" else day
+
+def generate_project_series(
+    db: Session,
+    project_id: int,
+    year: int,
+    month_num: int,
+    granularity: str,
+    hourly_costs: Dict[int, Decimal]
+) -> List[dict]:
+    """Horas y coste del proyecto por día o por semana (empezando en lunes), con acumulados.
+
+    Incluye todos los periodos del mes, también los que no tienen horas, para
+    poder dibujar el consumo del proyecto sin descargar las entradas.
+    """
+    if granularity not in PROJECT_SERIES_GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+
+    # Agrupa por día y empleado en SQL (portable) y por periodo en Python
+    rows = db.query(
+        models.TimeEntry.entry_date,
+        models.TimeEntry.employee_id,
+        func.sum(models.TimeEntry.hours)
+    ).filter(
+        models.TimeEntry.project_id == project_id,
+        month_filter(year, month_num)
+    ).group_by(models.TimeEntry.entry_date, models.TimeEntry.employee_id)
+
+    hours_by_period: Dict[date, Decimal] = defaultdict(Decimal)
+    cost_by_period: Dict[date, Decimal] = defaultdict(Decimal)
+    for entry_date, employee_id, hours in rows:
+        period = _period_start(entry_date, granularity)
+        hours = hours or Decimal(0)
+        hours_by_period[period] += hours
+        cost_by_period[period] += hours * hourly_costs.get(employee_id, Decimal(0))
+
+    start, end = get_month_range(year, month_num)
+    periods = sorted({_period_start(start + timedelta(days=offset), granularity) for offset in range((end - start).days)})
+    series = []
+    cumulative_hours = Decimal(0)
+    cumulative_cost = Decimal(0)
+    for period in periods:
+        cumulative_hours += hours_by_period.get(period, Decimal(0))
+        cumulative_cost += cost_by_period.get(period, Decimal(0))
+        series.append({
+            "period": period.isoformat(),
+            "hours": hours_by_period.get(period, Decimal(0)),
+            "cost": cost_by_period.get(period, Decimal(0)),
+            "cumulative_hours": cumulative_hours,
+            "cumulative_cost": cumulative_cost
+        })
+    return series
+
+def build_project_report_data(
+    project: models.Project,
+    breakdown_rows: Iterable[tuple],
+    year: int,
+    month_num: int
+) -> dict:
+    """Informe de un proyecto a partir de las filas de project_breakdown_rows.
+
+    El coste del proyecto es la suma del desglose por empleado.
+    """
+    breakdown = []
+    for employee_id, employee_name, monthly_cost, hours_per_month, hours in breakdown_rows:
+        hours = hours or Decimal(0)
+        breakdown.append({
+            "employee_id": employee_id,
+            "employee_name": employee_name,
+            "hours": hours,
+            "cost": hours * calculate_hourly_cost(monthly_cost, hours_per_month),
+            "percentage": 0  # Se calcula más abajo
+        })
+
+    total_hours = sum((item["hours"] for item in breakdown), Decimal(0))
+    cost = sum((item["cost"] for item in breakdown), Decimal(0))
+    for item in breakdown:
+        if total_hours > 0:
+            item["percentage"] = (item["hours"] / total_hours) * 100
+
+    if project.price_type == "fixed":
+        revenue = project.price_value
+    else:  # hourly
+        revenue = total_hours * project.price_value
+    margin = calculate_project_margin(revenue, cost)
+    status = get_project_status(margin, revenue)
+
+    return {
+        "project": {
+            "id": project.id,
+            "name": project.name,
+            "price_type": project.price_type,
+            "price_value": project.price_value
+        },
+        "month": f"{year}-{month_num:02d}",
+        "hours": total_hours,
+        "cost": cost,
+        "revenue": revenue,
+        "margin": margin,
+        "status": status,
+        "breakdown": breakdown
+    }
+
+def generate_project_report_data(
+    db: Session,
+    project_id: int,
+    year: int,
+    month_num: int,
+    granularity: Optional[str] = None
+) -> Optional[dict]:
+    """Informe de un proyecto en un mes con el desglose por empleado, o None si el proyecto no existe.
+
+    El desglose sale de una única consulta agrupada por empleado. Con
+    granularity ("day" o "week") se añade la serie de generate_project_series.
+    """
+    project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    if not project:
+        return None
+
+    rows = project_breakdown_rows(db, project_id, year, month_num)
+    report = build_project_report_data(project, rows, year, month_num)
+    if granularity is not None:
+        hourly_costs = {
+            employee_id: calculate_hourly_cost(monthly_cost, hours_per_month)
+            for employee_id, _, monthly_cost, hours_per_month, _ in rows
+        }
+        report["series"] = generate_project_series(db, project_id, year, month_num, granularity, hourly_costs)
+    return report
+
+def get_month_hours(db: Session, year: int, month_num: int) -> List[HoursRow]:
+    """Horas del mes por (project_id, employee_id) sumadas desde time_entries, en ese orden"""
+    return db.query(
+        models.TimeEntry.project_id,
+        models.TimeEntry.employee_id,
+        func.sum(models.TimeEntry.hours)
+    ).filter(
+        month_filter(year, month_num)
+    ).group_by(
+        models.TimeEntry.project_id,
+        models.TimeEntry.employee_id
+    ).order_by(
+        models.TimeEntry.project_id,
+        models.TimeEntry.employee_id
+    ).all()
+
+def build_month_reports(
+    projects: Iterable[models.Project],
+    employees: Iterable[models.Employee],
+    hours_rows: List[HoursRow],
+    year: int,
+    month_num: int
+) -> Tuple[dict, Dict[int, dict], Dict[int, dict]]:
+    """Resumen del mes y los informes de cada proyecto y cada empleado, en memoria.
+
+    Reparte las horas de get_month_hours en lugar de consultar cada informe
+    por separado; los informes salen iguales que los de
+    generate_project_report_data y generate_employee_report_data.
+    """
+    projects = list(projects)
+    employees = list(employees)
+    summary = get_summary_builder()(projects, employees, hours_rows)
+    # Los ingresos atribuidos de los informes de empleado son siempre exactos
+    exact = summary if REPORT_ENGINE == "decimal" else build_summary_report_data(projects, employees, hours_rows)
+    revenues = {report.id: report.revenue_attributed for report in exact["employees"]}
+
+    employees_by_id = {employee.id: employee for employee in employees}
+    breakdown_rows: Dict[int, List[tuple]] = defaultdict(list)
+    for project_id, employee_id, hours in hours_rows:
+        employee = employees_by_id[employee_id]
+        breakdown_rows[project_id].append(
+            (employee.id, employee.name, employee.monthly_cost, employee.hours_per_month, hours)
+        )
+
+    project_reports = {
+        project.id: build_project_report_data(project, breakdown_rows.get(project.id, []), year, month_num)
+        for project in projects
+    }
+    employee_reports = {
+        employee.id: build_employee_report_data(employee, revenues[employee.id], year, month_num)
+        for employee in employees
+    }
+    return summary, project_reports, employee_reports
+
+def month_range(first: date, last: date) -> List[date]:
+    """Primer día de cada mes entre first y last, ambos incluidos"""
+    months = []
+    current = first.replace(day=1)
+    while current <= last:
+        months.append(current)
+        current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+    return months
+
+def _trend_point(month: date, hours, cost, revenue, margin, status) -> schemas.TrendPoint:
+    return schemas.TrendPoint(
+        month=f"{month:%Y-%m}",
+        hours=hours,
+        cost=cost,
+        revenue=revenue,
+        margin=margin,
+        status=status
+    )
+
+def build_trend_report_data(
+    projects: Iterable[models.Project],
+    employees: Iterable[models.Employee],
+    hours_rows: Iterable[Tuple[date, int, int, Decimal]],
+    months: List[date],
+    group: str,
+    closed: Optional[Dict[date, dict]] = None
+) -> List[schemas.TrendSeries]:
+    """Series mensuales de horas, coste, ingresos, margen y estado.
+
+    Cada mes se calcula con el constructor del resumen, así que las reglas son
+    las del resumen mensual: los proyectos de precio fijo ingresan su precio
+    completo cada mes y el coste de un empleado es su coste mensual. Los meses
+    de closed (mes -> resumen guardado al cerrarlo) no se recalculan; quien no
+    existía al cerrar un mes no tiene punto en ese mes.
+    """
+    if group not in TREND_GROUPS:
+        raise ValueError(f"Unknown trend group: {group}")
+    projects = list(projects)
+    employees = list(employees)
+
+    build_summary = get_summary_builder()
+    rows_by_month: Dict[date, List[HoursRow]] = defaultdict(list)
+    for month, project_id, employee_id, hours in hours_rows:
+        rows_by_month[month].append((project_id, employee_id, hours))
+
+    points: Dict[object, List[schemas.TrendPoint]] = defaultdict(list)
+    for month in months:
+        rows = rows_by_month.get(month, [])
+        if closed and month in closed:
+            summary = closed[month]
+        else:
+            summary = build_summary(projects, employees, rows)
+        if group == "project":
+            for report in summary["projects"]:
+                points[report.id].append(_trend_point(
+                    month, report.hours, report.cost, report.revenue, report.margin, report.status
+                ))
+        elif group == "employee":
+            employee_hours: Dict[int, Decimal] = defaultdict(Decimal)
+            for _, employee_id, hours in rows:
+                employee_hours[employee_id] += hours or Decimal(0)
+            for report in summary["employees"]:
+                points[report.id].append(_trend_point(
+                    month,
+                    employee_hours.get(report.id, Decimal(0)),
+                    report.monthly_cost,
+                    report.revenue_attributed,
+                    report.margin,
+                    report.status
+                ))
+        else:  # total
+            revenue = sum((report.revenue for report in summary["projects"]), Decimal(0))
+            margin = summary["total_profit"]
+            points[None].append(_trend_point(
+                month,
+                sum((report.hours for report in summary["projects"]), Decimal(0)),
+                sum((report.cost for report in summary["projects"]), Decimal(0)),
+                revenue,
+                margin,
+                get_project_status(margin, revenue)
+            ))
+
+    if group == "total":
+        return [schemas.TrendSeries(id=None, name="Total", points=points[None])]
+    items = projects if group == "project" else employees
+    return [schemas.TrendSeries(id=item.id, name=item.name, points=points[item.id]) for item in items]
+
+def generate_trend_report_data(
+    db: Session,
+    first_month: date,
+    last_month: date,
+    group: str,
+    closed: Optional[Dict[date, dict]] = None
+) -> List[schemas.TrendSeries]:
+    """Genera la tendencia de un rango de meses con tres consultas, sea cual sea el número de meses"""
+    projects = db.query(models.Project).all()
+    employees = db.query(models.Employee).all()
+    hours_rows = get_rollup_hours_between(db, first_month, last_month)
+    return build_trend_report_data(
+        projects, employees, hours_rows, month_range(first_month, last_month), group, closed
+    )
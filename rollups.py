@@ -0,0 +1,218 @@
+from decimal import Decimal
+from datetime import date
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import argparse
+import sys
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, func
+from app import models
+from app.calculations import month_filter
+from app.writes import dialect_insert
+
+CENT = Decimal("0.01")
+
+# (employee_id, project_id, entry_date, hours) de una entrada de tiempo
+EntrySnapshot = Tuple[int, int, date, Decimal]
+# (employee_id, project_id, primer día del mes)
+RollupKey = Tuple[int, int, date]
+
+def month_start(day: date) -> date:
+    """Primer día del mes de una fecha"""
+    return day.replace(day=1)
+
+def entry_snapshot(entry: models.TimeEntry) -> EntrySnapshot:
+    """Copia los campos de una entrada que afectan al acumulado mensual"""
+    return (entry.employee_id, entry.project_id, entry.entry_date, entry.hours)
+
+def add_rollup_hours(
+    db: Session,
+    employee_id: int,
+    project_id: int,
+    entry_date: date,
+    hours: Decimal
+) -> None:
+    """Suma (o resta, si hours es negativo) horas al acumulado mensual.
+
+    El incremento se hace con un INSERT ... ON CONFLICT DO UPDATE, de modo que
+    dos escrituras concurrentes sobre la misma fila no se pisan.
+    """
+    table = models.MonthlyRollup.__table__
+    month = month_start(entry_date)
+    insert = dialect_insert(db)
+
+    stmt = insert(table).values(
+        employee_id=employee_id,
+        project_id=project_id,
+        month=month,
+        hours=hours
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.employee_id, table.c.project_id, table.c.month],
+        set_={"hours": table.c.hours + stmt.excluded.hours}
+    )
+    db.execute(stmt)
+
+    if hours < 0:
+        # Sin horas el acumulado no aporta nada y bloquearía borrar el empleado o proyecto
+        db.execute(delete(table).where(
+            table.c.employee_id == employee_id,
+            table.c.project_id == project_id,
+            table.c.month == month,
+            table.c.hours <= 0
+        ))
+
+def apply_time_entry_change(
+    db: Session,
+    old: Optional[EntrySnapshot],
+    new: Optional[EntrySnapshot]
+) -> None:
+    """Actualiza el acumulado mensual tras crear (old=None), editar o borrar (new=None) una entrada"""
+    if old is not None and new is not None:
+        old_key = (old[0], old[1], month_start(old[2]))
+        new_key = (new[0], new[1], month_start(new[2]))
+        if old_key == new_key:
+            if new[3] != old[3]:
+                add_rollup_hours(db, new[0], new[1], new[2], new[3] - old[3])
+            return
+    if old is not None:
+        add_rollup_hours(db, old[0], old[1], old[2], -old[3])
+    if new is not None:
+        add_rollup_hours(db, new[0], new[1], new[2], new[3])
+
+def get_month_rollup_hours(db: Session, year: int, month: int) -> List[Tuple[int, int, Decimal]]:
+    """Horas del mes por (project_id, employee_id) leídas del acumulado mensual"""
+    return db.query(
+        models.MonthlyRollup.project_id,
+        models.MonthlyRollup.employee_id,
+        models.MonthlyRollup.hours
+    ).filter(
+        models.MonthlyRollup.month == date(year, month, 1)
+    ).all()
+
+def get_rollup_hours_between(
+    db: Session,
+    first_month: date,
+    last_month: date
+) -> List[Tuple[date, int, int, Decimal]]:
+    """Horas por (mes, project_id, employee_id) de un rango de meses, ambos incluidos"""
+    return db.query(
+        models.MonthlyRollup.month,
+        models.MonthlyRollup.project_id,
+        models.MonthlyRollup.employee_id,
+        models.MonthlyRollup.hours
+    ).filter(
+        models.MonthlyRollup.month >= month_start(first_month),
+        models.MonthlyRollup.month <= month_start(last_month)
+    ).all()
+
+def _aggregate_time_entries(
+    db: Session,
+    year: Optional[int] = None,
+    month: Optional[int] = None
+) -> Dict[RollupKey, Decimal]:
+    # Agrupa por día en SQL (portable) y por mes en Python
+    query = db.query(
+        models.TimeEntry.employee_id,
+        models.TimeEntry.project_id,
+        models.TimeEntry.entry_date,
+        func.sum(models.TimeEntry.hours)
+    )
+    if year is not None and month is not None:
+        query = query.filter(month_filter(year, month))
+    rows = query.group_by(
+        models.TimeEntry.employee_id,
+        models.TimeEntry.project_id,
+        models.TimeEntry.entry_date
+    )
+
+    totals: Dict[RollupKey, Decimal] = defaultdict(Decimal)
+    for employee_id, project_id, entry_date, hours in rows:
+        totals[(employee_id, project_id, month_start(entry_date))] += hours or Decimal(0)
+    return totals
+
+def rebuild_rollups(db: Session, year: Optional[int] = None, month: Optional[int] = None) -> int:
+    """Reconstruye el acumulado mensual desde time_entries (todo o un único mes).
+
+    Devuelve el número de filas escritas. No hace commit.
+    """
+    table = models.MonthlyRollup.__table__
+    clear = delete(table)
+    if year is not None and month is not None:
+        clear = clear.where(table.c.month == date(year, month, 1))
+    db.execute(clear)
+
+    totals = _aggregate_time_entries(db, year, month)
+    rows = [
+        {"employee_id": employee_id, "project_id": project_id, "month": month_key, "hours": hours}
+        for (employee_id, project_id, month_key), hours in totals.items()
+    ]
+    if rows:
+        db.execute(table.insert(), rows)
+    return len(rows)
+
+def check_rollups(db: Session, year: Optional[int] = None, month: Optional[int] = None) -> List[str]:
+    """Compara el acumulado mensual con los datos de time_entries.
+
+    Devuelve una lista de discrepancias legibles; vacía si todo cuadra.
+    """
+    expected = _aggregate_time_entries(db, year, month)
+
+    query = db.query(models.MonthlyRollup)
+    if year is not None and month is not None:
+        query = query.filter(models.MonthlyRollup.month == date(year, month, 1))
+    actual = {(r.employee_id, r.project_id, r.month): r for r in query.all()}
+
+    problems = []
+    for key in sorted(set(expected) | set(actual)):
+        employee_id, project_id, month_key = key
+        label = f"employee={employee_id} project={project_id} month={month_key:%Y-%m}"
+        expected_hours = expected.get(key, Decimal(0))
+        rollup = actual.get(key)
+        if rollup is None:
+            if expected_hours != 0:
+                problems.append(f"{label}: missing rollup, expected {expected_hours} hours")
+            continue
+        rollup_hours = Decimal(rollup.hours).quantize(CENT)
+        if rollup_hours != Decimal(expected_hours).quantize(CENT):
+            problems.append(f"{label}: hours {rollup_hours} != {expected_hours}")
+    return problems
+
+def _parse_month(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    if not value:
+        return None, None
+    year, month_num = map(int, value.split("-"))
+    return year, month_num
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from app.database import SessionLocal
+    from app.report_cache import report_cache
+
+    parser = argparse.ArgumentParser(description="Maintain the monthly_rollups table")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--month", help="Limit to one month (YYYY-MM)")
+    args = parser.parse_args(argv)
+    year, month_num = _parse_month(args.month)
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            # Los informes en caché y los ETag dejan de valer con los nuevos
+            # totales. Va antes de reconstruir: bloquea el mes como las
+            # escrituras de entradas (ver month_close.lock_months), que así
+            # esperan al commit en vez de cruzarse con el recuento
+            report_cache.invalidate(db, [(year, month_num)] if year is not None else None)
+            count = rebuild_rollups(db, year, month_num)
+            db.commit()
+            print(f"Rebuilt {count} rollup rows")
+            return 0
+        problems = check_rollups(db, year, month_num)
+        for problem in problems:
+            print(problem)
+        print(f"{len(problems)} inconsistencies found")
+        return 1 if problems else 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
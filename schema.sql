@@ -6,6 +6,7 @@ CREATE TABLE IF NOT EXISTS users (
   email TEXT UNIQUE NOT NULL,
   password_hash TEXT NOT NULL,
   role TEXT NOT NULL CHECK (role IN ('admin','employee')),
+  token_version INTEGER NOT NULL DEFAULT 0,
   created_at TIMESTAMP DEFAULT now()
 );
 
@@ -15,7 +16,9 @@ CREATE TABLE IF NOT EXISTS employees (
   monthly_cost NUMERIC(12,2) NOT NULL,
   hours_per_month INTEGER DEFAULT 160,
   user_id INTEGER REFERENCES users(id),
-  created_at TIMESTAMP DEFAULT now()
+  created_at TIMESTAMP DEFAULT now(),
+  updated_at TIMESTAMP NOT NULL DEFAULT now(),
+  change_seq BIGINT NOT NULL DEFAULT 0
 );
 
 CREATE TABLE IF NOT EXISTS projects (
@@ -23,7 +26,9 @@ CREATE TABLE IF NOT EXISTS projects (
   name TEXT NOT NULL,
   price_type TEXT NOT NULL CHECK (price_type IN ('fixed','hourly')),
   price_value NUMERIC(12,2) NOT NULL,
-  created_at TIMESTAMP DEFAULT now()
+  created_at TIMESTAMP DEFAULT now(),
+  updated_at TIMESTAMP NOT NULL DEFAULT now(),
+  change_seq BIGINT NOT NULL DEFAULT 0
 );
 
 CREATE TABLE IF NOT EXISTS time_entries (
@@ -33,11 +38,59 @@ CREATE TABLE IF NOT EXISTS time_entries (
   entry_date DATE NOT NULL,
   hours NUMERIC(5,2) NOT NULL,
   note TEXT,
-  created_at TIMESTAMP DEFAULT now()
+  created_at TIMESTAMP DEFAULT now(),
+  updated_at TIMESTAMP NOT NULL DEFAULT now(),
+  change_seq BIGINT NOT NULL DEFAULT 0
 );
 
 -- Indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_time_entries_date ON time_entries(entry_date);
 CREATE INDEX IF NOT EXISTS idx_time_entries_employee ON time_entries(employee_id);
 CREATE INDEX IF NOT EXISTS idx_time_entries_project ON time_entries(project_id);
+CREATE INDEX IF NOT EXISTS idx_time_entries_project_date ON time_entries(project_id, entry_date) INCLUDE (employee_id, hours);
+CREATE INDEX IF NOT EXISTS idx_time_entries_employee_date ON time_entries(employee_id, entry_date) INCLUDE (project_id, hours);
+
+-- Change tracking for /sync (see app/sync.py); the ORM sets change_seq to the
+-- table's data_versions counter on every insert and update
+CREATE INDEX IF NOT EXISTS idx_employees_change_seq ON employees(change_seq);
+CREATE INDEX IF NOT EXISTS idx_projects_change_seq ON projects(change_seq);
+CREATE INDEX IF NOT EXISTS idx_time_entries_change_seq ON time_entries(change_seq);
+
+CREATE TABLE IF NOT EXISTS tombstones (
+  id SERIAL PRIMARY KEY,
+  table_name TEXT NOT NULL,
+  row_id INTEGER NOT NULL,
+  deleted_at TIMESTAMP NOT NULL DEFAULT now(),
+  change_seq BIGINT NOT NULL DEFAULT 0
+);
 
+CREATE INDEX IF NOT EXISTS idx_tombstones_deleted_at ON tombstones(deleted_at);
+CREATE INDEX IF NOT EXISTS idx_tombstones_change_seq ON tombstones(table_name, change_seq);
+
+-- Monthly hours per employee and project (see app/rollups.py)
+CREATE TABLE IF NOT EXISTS monthly_rollups (
+  employee_id INTEGER REFERENCES employees(id) ON DELETE CASCADE NOT NULL,
+  project_id INTEGER REFERENCES projects(id) ON DELETE CASCADE NOT NULL,
+  month DATE NOT NULL,
+  hours NUMERIC(12,2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (employee_id, project_id, month)
+);
+
+CREATE INDEX IF NOT EXISTS idx_monthly_rollups_month ON monthly_rollups(month);
+
+-- Frozen reports of closed months (see app/month_close.py)
+CREATE TABLE IF NOT EXISTS month_snapshots (
+  month DATE PRIMARY KEY,
+  closed_at TIMESTAMP DEFAULT NOW(),
+  closed_by INTEGER REFERENCES users(id) ON DELETE SET NULL,
+  summary JSON NOT NULL,
+  projects JSON NOT NULL,
+  employees JSON NOT NULL,
+  cost_rates JSON NOT NULL
+);
+
+-- Change counters bumped in the transaction of every write (see app/versions.py)
+CREATE TABLE IF NOT EXISTS data_versions (
+  name TEXT PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0
+);
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, EmailStr
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 # Auth schemas
 class UserCreate(BaseModel):
@@ -35,6 +35,7 @@ class Employee(EmployeeBase):
     id: int
     user_id: Optional[int] = None
     created_at: datetime
+    updated_at: datetime
     
     class Config:
         from_attributes = True
@@ -56,6 +57,7 @@ class ProjectUpdate(BaseModel):
 class Project(ProjectBase):
     id: int
     created_at: datetime
+    updated_at: datetime
     
     class Config:
         from_attributes = True
@@ -81,10 +83,19 @@ class TimeEntryUpdate(BaseModel):
 class TimeEntry(TimeEntryBase):
     id: int
     created_at: datetime
+    updated_at: datetime
     
     class Config:
         from_attributes = True
 
+class TimeEntryBulkError(BaseModel):
+    row: int  # position of the row in the submitted list/CSV (0-based)
+    error: str
+
+class TimeEntryBulkResult(BaseModel):
+    created: int
+    errors: List[TimeEntryBulkError]
+
 # Report schemas
 class ProjectReport(BaseModel):
     id: int
@@ -109,3 +120,36 @@ class SummaryReport(BaseModel):
     projects: List[ProjectReport]
     employees: List[EmployeeReport]
 
+
+class TrendPoint(BaseModel):
+    month: str  # YYYY-MM
+    hours: Decimal
+    cost: Decimal
+    revenue: Decimal
+    margin: Decimal
+    status: str  # 'green', 'yellow', 'red'
+
+class TrendSeries(BaseModel):
+    id: Optional[int] = None  # project/employee id; None for group=total
+    name: str
+    points: List[TrendPoint]
+
+class TrendReport(BaseModel):
+    month_from: str
+    month_to: str
+    group: str  # 'project', 'employee' or 'total'
+    series: List[TrendSeries]
+
+class ClosedMonth(BaseModel):
+    month: str  # YYYY-MM
+    closed_at: Optional[datetime] = None
+    closed_by: Optional[int] = None
+
+# Sync schemas
+class SyncChanges(BaseModel):
+    token: str  # pass as since on the next call
+    reset: bool  # reload the list endpoints, then continue from token
+    employees: List[Employee]
+    projects: List[Project]
+    time_entries: List[TimeEntry]
+    deleted: Dict[str, List[int]]  # employees / projects / time_entries -> deleted ids
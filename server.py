@@ -0,0 +1,50 @@
+from typing import List, Optional
+import argparse
+import os
+import sys
+import uvicorn
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the API for production (run.py is the reloading dev server)")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+        help="Worker processes (WEB_CONCURRENCY); each one has its own pools and caches"
+    )
+    parser.add_argument(
+        "--loop", choices=("auto", "asyncio", "uvloop"), default=os.getenv("UVICORN_LOOP", "auto"),
+        help="Event loop (UVICORN_LOOP); auto uses uvloop when installed"
+    )
+    parser.add_argument(
+        "--http", choices=("auto", "h11", "httptools"), default=os.getenv("UVICORN_HTTP", "auto"),
+        help="HTTP parser (UVICORN_HTTP); auto uses httptools when installed"
+    )
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    parser.add_argument("--access-log", action="store_true", help="Log every request")
+    parser.add_argument(
+        "--forwarded-allow-ips", default=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        help="Proxies trusted for X-Forwarded-* headers"
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    # The import string lets every worker import the app itself; importing
+    # it does not touch the database (see GET /health/ready)
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=args.loop,
+        http=args.http,
+        log_level=args.log_level,
+        access_log=args.access_log,
+        proxy_headers=True,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
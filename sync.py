@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import hashlib
+import os
+from fastapi import HTTPException
+from sqlalchemy import and_, delete, insert, or_
+from sqlalchemy.orm import Query, Session
+from app import models, schemas
+from app.fast_json import query_columns, schema_fields
+from app.pagination import decode_cursor, encode_cursor
+from app.versions import bump_versions, read_versions
+
+# Changes are tracked with each table's change counter in data_versions, not
+# a clock: a write bumps it before writing its rows, which take the new value
+# as change_seq, and holds the counter row locked until it commits. Writes to
+# a table therefore get their values in commit order, and a token holding the
+# counters read by /sync covers every row committed with a value up to them.
+
+# Deltas larger than this ask the client to reload the lists instead
+SYNC_MAX_ROWS = int(os.getenv("SYNC_MAX_ROWS", "5000"))
+# Tombstones are kept this long; older tokens get a reset
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+
+# Response key -> (model, schema the rows are sent as)
+SYNCED_MODELS = {
+    "employees": (models.Employee, schemas.Employee),
+    "projects": (models.Project, schemas.Project),
+    "time_entries": (models.TimeEntry, schemas.TimeEntry),
+}
+
+SyncToken = Tuple[datetime, Dict[str, int]]
+
+def encode_sync_token(issued_at: datetime, seqs: Dict[str, int]) -> str:
+    return encode_cursor({"t": issued_at.isoformat(), "v": seqs})
+
+def decode_sync_token(token: str) -> Optional[SyncToken]:
+    """When the token was issued and the change counters it covers; None for
+    a token issued before the counters, which gets a reset"""
+    try:
+        payload = decode_cursor(token)
+        issued_at = datetime.fromisoformat(payload["t"])
+        if "v" not in payload:
+            return None
+        return issued_at, {name: int(seq) for name, seq in payload["v"].items()}
+    except (AttributeError, KeyError, TypeError, ValueError, HTTPException):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+def record_tombstone(db: Session, model, row_id: int) -> None:
+    """Record a deleted row for /sync and prune expired tombstones. Does not
+    commit; call it after record_change, like the row writes."""
+    table = models.Tombstone.__table__
+    name = model.__tablename__
+    db.execute(insert(table).values(table_name=name, row_id=row_id, change_seq=models.change_seq_of(name)))
+    # The application clock saves reading the database one; the extra day
+    # covers the offset between UTC and the database's local timestamps
+    cutoff = datetime.utcnow() - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS + 1)
+    db.execute(delete(table).where(table.c.deleted_at < cutoff))
+
+def record_change(db: Session, *changed_models, reports: Iterable[str] = ()) -> None:
+    """Bump the change counter of the tables a transaction writes, and the
+    report versions in reports (see ReportCache.versions_written), in one
+    statement. Does not commit.
+
+    Call it before writing the rows: they and their tombstones take the new
+    counter value as change_seq (see models.change_seq_of), which /sync
+    tracks, and the list ETags are built from it. The counter rows stay
+    locked until the transaction ends (see app.versions.bump_versions), so
+    keep what follows short.
+    """
+    bump_versions(db, *(model.__tablename__ for model in changed_models), *reports)
+
+def list_etag(db: Session, model, name: str, *params) -> str:
+    """Weak ETag of a list endpoint, from the change counter of its table.
+
+    One primary-key lookup instead of reading the rows; every committed
+    write to the table changes it, whatever the filters in params.
+    """
+    version = read_versions(db, model.__tablename__)[model.__tablename__]
+    versions = "|".join(str(value) for value in (version,) + params)
+    return f'W/"{name}-{hashlib.sha1(versions.encode("utf-8")).hexdigest()[:20]}"'
+
+def _changed_rows(query: Query, model, since: int, until: int, limit: int) -> List:
+    return query.add_columns(model.change_seq).filter(
+        model.change_seq > since, model.change_seq <= until
+    ).order_by(model.change_seq, model.id).limit(limit).all()
+
+def get_changes(db: Session, token: Optional[str]) -> dict:
+    """Rows changed and ids deleted since token, plus the token for the next call.
+
+    Without a token, or when the delta is too large or older than the
+    tombstones, the answer is reset=True with no rows: the client reloads
+    the list endpoints and continues from the returned token.
+    """
+    tables = {model.__tablename__: name for name, (model, _) in SYNCED_MODELS.items()}
+    # Read before the rows: every change up to these values is committed
+    until = read_versions(db, *tables)
+    issued_at = datetime.utcnow()
+    changes = {"token": encode_sync_token(issued_at, until), "reset": True, "deleted": {}}
+    changes.update({name: [] for name in SYNCED_MODELS})
+    since = None if token is None else decode_sync_token(token)
+    if since is None or since[0] < issued_at - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS):
+        return changes
+    seqs = {table_name: since[1].get(table_name, 0) for table_name in tables}
+    if any(seqs[table_name] > seq for table_name, seq in until.items()):
+        # Counters behind the token: the database was restored or replaced
+        return changes
+
+    budget = SYNC_MAX_ROWS
+    rows: Dict[str, List[dict]] = {}
+    updated: Dict[Tuple[str, int], int] = {}
+    for name, (model, schema) in SYNCED_MODELS.items():
+        fields = schema_fields(schema)
+        table_name = model.__tablename__
+        changed = _changed_rows(
+            query_columns(db, model, fields), model, seqs[table_name], until[table_name], budget + 1
+        )
+        budget -= len(changed)
+        if budget < 0:
+            return changes
+        rows[name] = [dict(zip(fields, row)) for row in changed]
+        updated.update(((name, row.id), row.change_seq) for row in changed)
+
+    tombstone = models.Tombstone
+    deletions: List[Tuple[str, int, int]] = db.query(
+        tombstone.table_name, tombstone.row_id, tombstone.change_seq
+    ).filter(or_(*(
+        and_(tombstone.table_name == table_name, tombstone.change_seq > seqs[table_name],
+             tombstone.change_seq <= seq)
+        for table_name, seq in until.items()
+    ))).limit(budget + 1).all()
+    if len(deletions) > budget:
+        return changes
+
+    # A deletion followed by a new row with the same id (SQLite can reuse the
+    # highest id) is not reported as deleted
+    deleted: Dict[str, List[int]] = {}
+    for table_name, row_id, change_seq in deletions:
+        name = tables[table_name]
+        if updated.get((name, row_id), 0) > change_seq:
+            continue
+        deleted.setdefault(name, []).append(row_id)
+
+    changes.update(rows)
+    changes.update({"reset": False, "deleted": deleted})
+    return changes
@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+from typing import Callable, Tuple
+import os
+import tracemalloc
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from app import models
+from app.datagen import SCALES, DatasetSpec, generate_dataset, reset_database
+
+# Scales to benchmark (comma-separated names from app.datagen.SCALES)
+BENCHMARK_SCALES = [
+    scale.strip() for scale in os.getenv("BENCHMARK_SCALES", "small").split(",") if scale.strip()
+]
+# Database the datasets are generated in; all its data is replaced.
+# Defaults to a temporary SQLite file.
+BENCHMARK_DATABASE_URL = os.getenv("BENCHMARK_DATABASE_URL")
+
+@dataclass
+class Dataset:
+    scale: str
+    spec: DatasetSpec
+    counts: dict
+    sessions: sessionmaker
+    employee_id: int
+    project_id: int
+
+    def measure(self, fn: Callable[[Session], object]) -> Tuple[int, float]:
+        """Queries and peak Python memory (KiB) of one fn(session) call on a fresh session"""
+        engine = self.sessions.kw["bind"]
+        queries = [0]
+
+        def count(*args):
+            queries[0] += 1
+
+        event.listen(engine, "before_cursor_execute", count)
+        session = self.sessions()
+        tracemalloc.start()
+        try:
+            fn(session)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            session.close()
+            event.remove(engine, "before_cursor_execute", count)
+        return queries[0], round(peak / 1024, 1)
+
+    def run(self, fn: Callable[[Session], object]):
+        """fn(session) on a fresh session, as an endpoint call gets one"""
+        session = self.sessions()
+        try:
+            return fn(session)
+        finally:
+            session.close()
+
+def _first_id(db: Session, model) -> int:
+    return db.query(model.id).order_by(model.id).limit(1).scalar()
+
+@pytest.fixture(scope="session", params=BENCHMARK_SCALES)
+def dataset(request, tmp_path_factory) -> Dataset:
+    """The deterministic app.datagen dataset of one scale, generated once per session"""
+    scale = request.param
+    if scale not in SCALES:
+        pytest.fail(f"unknown scale {scale!r}, choose from {', '.join(SCALES)}")
+    url = BENCHMARK_DATABASE_URL or f"sqlite:///{tmp_path_factory.mktemp('benchmark') / (scale + '.db')}"
+    engine = create_engine(url)
+    sessions = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = sessions()
+    try:
+        reset_database(db)
+        db = sessions()
+        counts = generate_dataset(db, SCALES[scale])
+        dataset = Dataset(
+            scale, SCALES[scale], counts, sessions,
+            _first_id(db, models.Employee), _first_id(db, models.Project)
+        )
+    finally:
+        db.close()
+    yield dataset
+    engine.dispose()
+
+@pytest.fixture
+def measured(benchmark, dataset):
+    """Benchmark fn(session) and return its query count, keeping the count and
+    peak memory with the timings (--benchmark-json, --benchmark-compare)"""
+    def measure(fn: Callable[[Session], object]) -> int:
+        queries, peak_kib = dataset.measure(fn)
+        benchmark.extra_info.update({"scale": dataset.scale, "queries": queries, "peak_kib": peak_kib})
+        benchmark(dataset.run, fn)
+        return queries
+    return measure
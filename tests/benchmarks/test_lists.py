@@ -0,0 +1,31 @@
+from typing import List
+import json
+from fastapi import Response
+from pydantic import TypeAdapter
+from app import models, schemas
+from app.calculations import month_filter
+from app.main import _list_time_entries
+from app.pagination import MAX_PAGE_SIZE, paginate_time_entries
+
+_TIME_ENTRY_LIST = TypeAdapter(List[schemas.TimeEntry])
+
+def test_time_entries_list(measured, dataset):
+    month = dataset.spec.last_month
+    queries = measured(lambda db: _list_time_entries(
+        db, f"{month:%Y-%m}", None, None, None, None, None, MAX_PAGE_SIZE, Response()
+    ).body)
+    # The list ETag and one page of rows
+    assert queries <= 2
+
+def test_time_entries_list_pydantic(measured, dataset):
+    # What the endpoint did before the orjson path: ORM rows validated
+    # against response_model, then encoded by JSONResponse
+    month = dataset.spec.last_month
+
+    def list_pydantic(db) -> bytes:
+        query = db.query(models.TimeEntry).filter(month_filter(month.year, month.month))
+        rows = paginate_time_entries(query, None, MAX_PAGE_SIZE, Response())
+        content = _TIME_ENTRY_LIST.dump_python(_TIME_ENTRY_LIST.validate_python(rows, from_attributes=True), mode="json")
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+    assert measured(list_pydantic) <= 1
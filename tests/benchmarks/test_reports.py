@@ -0,0 +1,47 @@
+from app.exports import stream_csv, summary_csv_rows
+from app.main import (
+    _generate_employee_report_data,
+    _generate_project_report_data,
+    _generate_summary_report_data,
+    _generate_trend_report_data
+)
+
+# The report helpers behind the endpoints, without the report cache or HTTP
+
+def test_summary(measured, dataset):
+    month = dataset.spec.last_month
+    assert measured(lambda db: _generate_summary_report_data(db, month.year, month.month)) <= 4
+
+def test_employee_report(measured, dataset):
+    month = dataset.spec.last_month
+    queries = measured(
+        lambda db: _generate_employee_report_data(db, dataset.employee_id, month.year, month.month)
+    )
+    assert queries <= 4
+
+def test_project_report(measured, dataset):
+    month = dataset.spec.last_month
+    queries = measured(
+        lambda db: _generate_project_report_data(db, dataset.project_id, month.year, month.month)
+    )
+    assert queries <= 3
+
+def test_project_report_weekly(measured, dataset):
+    month = dataset.spec.last_month
+    queries = measured(
+        lambda db: _generate_project_report_data(db, dataset.project_id, month.year, month.month, "week")
+    )
+    assert queries <= 4
+
+def test_trend(measured, dataset):
+    first_month, month = dataset.spec.month_starts()[0], dataset.spec.last_month
+    assert measured(lambda db: _generate_trend_report_data(db, first_month, month, "project")) <= 4
+
+def test_export_csv(measured, dataset):
+    month = dataset.spec.last_month
+
+    def export_csv(db) -> int:
+        summary = _generate_summary_report_data(db, month.year, month.month)
+        return sum(len(chunk) for chunk in stream_csv(summary_csv_rows(summary, f"{month:%Y-%m}")))
+
+    assert measured(export_csv) <= 4
@@ -0,0 +1,14 @@
+import subprocess
+import sys
+
+# Cold import of app.main, so slow imports show up as regressions
+_IMPORT = "import app.main; from app.metrics import startup_seconds; print(startup_seconds['import'])"
+
+def _import_seconds() -> float:
+    return float(subprocess.run([sys.executable, "-c", _IMPORT], capture_output=True, text=True, check=True).stdout)
+
+def test_import_app(benchmark):
+    # Each round is a fresh interpreter; the timing includes its startup,
+    # extra_info the import alone
+    seconds = benchmark.pedantic(_import_seconds, rounds=5, iterations=1)
+    benchmark.extra_info["import_ms"] = round(seconds * 1000, 3)
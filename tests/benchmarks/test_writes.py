@@ -0,0 +1,36 @@
+from app import models, schemas
+from app.main import create_time_entry, delete_time_entry, update_employee, update_time_entry
+from app.month_close import close_month
+
+# Endpoint functions called directly, one transaction each as the API does;
+# every case leaves the dataset as it found it
+
+def test_time_entry_write_cycle(measured, dataset):
+    entry = schemas.TimeEntryCreate(
+        employee_id=dataset.employee_id,
+        project_id=dataset.project_id,
+        entry_date=dataset.spec.last_month,
+        hours=1
+    )
+
+    def write_cycle(db) -> None:
+        entry_id = create_time_entry(entry, db, None)["id"]
+        update_time_entry(entry_id, schemas.TimeEntryUpdate(hours=2, note="benchmark"), db, None)
+        delete_time_entry(entry_id, db, None)
+
+    assert measured(write_cycle) <= 20
+
+def test_employee_update(measured, dataset):
+    name = dataset.run(lambda db: db.get(models.Employee, dataset.employee_id).name)
+    queries = measured(
+        lambda db: update_employee(dataset.employee_id, schemas.EmployeeUpdate(name=name), db, None)
+    )
+    # A single UPDATE ... RETURNING, plus the change counters
+    assert queries <= 2
+
+def test_close_month(measured, dataset):
+    month = dataset.spec.last_month
+    # The month lock and its closed check, employees, projects and the month's
+    # hours grouped by project and employee, then the snapshot INSERT; rolled
+    # back when the session closes
+    assert measured(lambda db: close_month(db, month.year, month.month)) <= 6
@@ -0,0 +1,34 @@
+from decimal import Decimal
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.database import Base
+
+@pytest.fixture
+def db():
+    """Session on an empty in-memory SQLite database with the current schema"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+@pytest.fixture
+def sessions(tmp_path):
+    """Session factory with separate connections to one SQLite file, with an employee and a project"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'shared.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autoflush=False, bind=engine)
+    db = factory()
+    db.add_all([
+        models.Employee(id=1, name="Ana", monthly_cost=Decimal("3200.00"), hours_per_month=160),
+        models.Project(id=1, name="P", price_type="hourly", price_value=Decimal("50.00")),
+    ])
+    db.commit()
+    db.close()
+    yield factory
+    engine.dispose()
@@ -0,0 +1,108 @@
+from datetime import date
+from decimal import Decimal
+import threading
+import pytest
+from app import models
+from app.month_close import MonthClosedError, _dump, close_month, ensure_months_open
+from app.report_engine import generate_employee_report_data, generate_project_report_data
+
+@pytest.fixture
+def month_data(db):
+    employees = [
+        models.Employee(name="Ana", monthly_cost=Decimal("3200.00"), hours_per_month=160),
+        models.Employee(name="Luis", monthly_cost=Decimal("4100.50"), hours_per_month=140),
+        models.Employee(name="Sin horas", monthly_cost=Decimal("2500.00"), hours_per_month=0),
+    ]
+    projects = [
+        models.Project(name="Por horas", price_type="hourly", price_value=Decimal("55.00")),
+        models.Project(name="Fijo", price_type="fixed", price_value=Decimal("9000.00")),
+        models.Project(name="Parado", price_type="hourly", price_value=Decimal("40.00")),
+    ]
+    db.add_all(employees + projects)
+    db.flush()
+    hours = [
+        (0, 0, date(2024, 2, 1), "7.50"), (0, 0, date(2024, 2, 29), "3.25"),
+        (0, 1, date(2024, 2, 12), "6.00"), (1, 0, date(2024, 2, 14), "2.75"),
+        (1, 1, date(2024, 2, 20), "8.00"), (1, 1, date(2024, 3, 1), "4.00"),
+    ]
+    db.add_all([
+        models.TimeEntry(
+            employee_id=employees[e].id, project_id=projects[p].id, entry_date=day, hours=Decimal(value)
+        )
+        for e, p, day, value in hours
+    ])
+    db.commit()
+    return employees, projects
+
+def test_snapshot_matches_live_reports(db, month_data):
+    employees, projects = month_data
+    snapshot = close_month(db, 2024, 2)
+    assert set(snapshot.projects) == {str(project.id) for project in projects}
+    assert set(snapshot.employees) == {str(employee.id) for employee in employees}
+    for project in projects:
+        assert snapshot.projects[str(project.id)] == _dump(generate_project_report_data(db, project.id, 2024, 2))
+    for employee in employees:
+        assert snapshot.employees[str(employee.id)] == _dump(generate_employee_report_data(db, employee.id, 2024, 2))
+
+def _in_thread(fn):
+    """Start fn in a thread; returns the thread and the dict its result or exception goes to"""
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = fn()
+        except Exception as exc:
+            outcome["error"] = exc
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+def test_write_waits_for_a_close_in_progress(sessions):
+    closer = sessions()
+    close_month(closer, 2024, 2)
+
+    writer = sessions()
+    thread, outcome = _in_thread(lambda: ensure_months_open(writer, date(2024, 2, 10)))
+    thread.join(0.5)
+    assert thread.is_alive(), "the write checked the month while it was being closed"
+
+    closer.commit()
+    thread.join(10)
+    writer.close()
+    closer.close()
+    assert isinstance(outcome.get("error"), MonthClosedError)
+
+def test_close_waits_for_a_write_in_progress(sessions):
+    writer = sessions()
+    ensure_months_open(writer, date(2024, 2, 10))
+    writer.add(models.TimeEntry(employee_id=1, project_id=1, entry_date=date(2024, 2, 10), hours=Decimal("3.00")))
+    writer.flush()
+
+    closer = sessions()
+    thread, outcome = _in_thread(lambda: close_month(closer, 2024, 2))
+    thread.join(0.5)
+    assert thread.is_alive(), "the month was closed while a write to it was in progress"
+
+    writer.commit()
+    writer.close()
+    thread.join(10)
+    projects = outcome["result"].projects
+    closer.commit()
+    closer.close()
+    assert projects["1"]["hours"] == "3.00"
+
+def test_second_close_waits_and_finds_the_month_closed(sessions):
+    first = sessions()
+    close_month(first, 2024, 2)
+
+    second = sessions()
+    thread, outcome = _in_thread(lambda: close_month(second, 2024, 2))
+    thread.join(0.5)
+    assert thread.is_alive(), "the month was closed twice at once"
+
+    first.commit()
+    thread.join(10)
+    second.close()
+    first.close()
+    assert isinstance(outcome.get("error"), MonthClosedError)
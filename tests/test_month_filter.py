@@ -0,0 +1,58 @@
+from datetime import date
+from decimal import Decimal
+import pytest
+from sqlalchemy import extract, select, text
+from app import models
+from app.calculations import month_filter
+
+BOUNDARY_DATES = [
+    date(2023, 12, 31),
+    date(2024, 1, 1),
+    date(2024, 1, 31),
+    date(2024, 2, 1),
+    date(2024, 2, 29),
+    date(2024, 3, 1),
+    date(2024, 12, 1),
+    date(2024, 12, 31),
+    date(2025, 1, 1),
+]
+
+@pytest.fixture
+def entries(db):
+    employee = models.Employee(name="E", monthly_cost=Decimal("3200.00"), hours_per_month=160)
+    project = models.Project(name="P", price_type="hourly", price_value=Decimal("50.00"))
+    db.add_all([employee, project])
+    db.flush()
+    db.add_all([
+        models.TimeEntry(employee_id=employee.id, project_id=project.id, entry_date=day, hours=Decimal("1.00"))
+        for day in BOUNDARY_DATES
+    ])
+    db.commit()
+    return employee, project
+
+def _query_plan(db, query) -> str:
+    compiled = query.compile(bind=db.get_bind(), compile_kwargs={"literal_binds": True})
+    rows = db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return "\n".join(row[-1] for row in rows)
+
+@pytest.mark.parametrize("year,month", [(2023, 12), (2024, 1), (2024, 2), (2024, 3), (2024, 12), (2025, 1)])
+def test_month_filter_matches_extract(db, entries, year, month):
+    entry = models.TimeEntry
+    by_range = db.scalars(select(entry.entry_date).where(month_filter(year, month))).all()
+    by_extract = db.scalars(select(entry.entry_date).where(
+        extract("year", entry.entry_date) == year,
+        extract("month", entry.entry_date) == month
+    )).all()
+    assert sorted(by_range) == sorted(by_extract)
+    assert by_range
+
+@pytest.mark.parametrize("column,index", [
+    ("project_id", "idx_time_entries_project_date"),
+    ("employee_id", "idx_time_entries_employee_date"),
+])
+def test_month_filter_uses_composite_index(db, entries, column, index):
+    entry = models.TimeEntry
+    query = select(entry.id, entry.hours).where(getattr(entry, column) == 1, month_filter(2024, 2))
+    plan = _query_plan(db, query)
+    assert index in plan
+    assert "entry_date>" in plan.replace(" ", "")
@@ -0,0 +1,33 @@
+from decimal import Decimal
+import pytest
+from app import models
+from app.datagen import SCALES, generate_dataset
+from app.numpy_engine import build_summary_report_data, compare_summaries, random_dataset, verify_month
+from app.report_engine import build_summary_report_data as build_decimal
+
+@pytest.mark.parametrize("seed", range(200))
+def test_engines_agree_on_random_data(seed):
+    projects, employees, hours_rows = random_dataset(seed)
+    expected = build_decimal(projects, employees, hours_rows)
+    actual = build_summary_report_data(projects, employees, hours_rows)
+    assert compare_summaries(expected, actual) == []
+
+def test_half_cent_ties_round_up():
+    # 0.02 h at 3000/160 = 18.75 €/h cost exactly 0.375; 0.01 h at 0.50 €/h bill 0.005
+    employees = [models.Employee(id=1, name="E", monthly_cost=Decimal("3000.00"), hours_per_month=160)]
+    projects = [
+        models.Project(id=1, name="Cost", price_type="hourly", price_value=Decimal("100.00")),
+        models.Project(id=2, name="Revenue", price_type="hourly", price_value=Decimal("0.50")),
+    ]
+    hours_rows = [(1, 1, Decimal("0.02")), (2, 1, Decimal("0.01"))]
+    expected = build_decimal(projects, employees, hours_rows)
+    actual = build_summary_report_data(projects, employees, hours_rows)
+    assert actual["projects"][0].cost == Decimal("0.38")
+    assert actual["projects"][1].revenue == Decimal("0.01")
+    assert compare_summaries(expected, actual) == []
+
+def test_engines_agree_on_seeded_database(db):
+    spec = SCALES["small"]
+    generate_dataset(db, spec)
+    for month in spec.month_starts():
+        assert verify_month(db, month.year, month.month) == []
@@ -0,0 +1,38 @@
+from datetime import date
+from decimal import Decimal
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app import database, models, rollups
+from app.report_cache import report_cache
+
+@pytest.fixture
+def entries(db, monkeypatch):
+    employee = models.Employee(name="E", monthly_cost=Decimal("3200.00"), hours_per_month=160)
+    project = models.Project(name="P", price_type="hourly", price_value=Decimal("50.00"))
+    db.add_all([employee, project])
+    db.flush()
+    db.add_all([
+        models.TimeEntry(employee_id=employee.id, project_id=project.id, entry_date=day, hours=Decimal("2.00"))
+        for day in (date(2024, 2, 5), date(2024, 3, 5))
+    ])
+    db.commit()
+    # The command opens its own session on the test database
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(autoflush=False, bind=db.get_bind()))
+
+def _etag(db, month):
+    etag = report_cache.etag("summary", month, None, report_cache.data_version(db, month))
+    db.commit()
+    return etag
+
+def test_rebuild_month_changes_its_report_etag(db, entries):
+    february, march = _etag(db, (2024, 2)), _etag(db, (2024, 3))
+    assert rollups.main(["rebuild", "--month", "2024-02"]) == 0
+    assert _etag(db, (2024, 2)) != february
+    assert _etag(db, (2024, 3)) == march
+
+def test_rebuild_all_changes_every_report_etag(db, entries):
+    february, march = _etag(db, (2024, 2)), _etag(db, (2024, 3))
+    assert rollups.main(["rebuild"]) == 0
+    assert _etag(db, (2024, 2)) != february
+    assert _etag(db, (2024, 3)) != march
+    assert rollups.main(["check"]) == 0
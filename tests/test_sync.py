@@ -0,0 +1,71 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert
+from app import models
+from app.pagination import encode_cursor
+from app.sync import get_changes, record_change, record_tombstone
+from app.writes import insert_returning
+
+def _add_entry(db, **values) -> int:
+    record_change(db, models.TimeEntry)
+    values = {"employee_id": 1, "project_id": 1, "entry_date": date(2024, 2, 1), "hours": 2, **values}
+    return insert_returning(db, models.TimeEntry, values).id
+
+def _synced(sessions, token):
+    db = sessions()
+    try:
+        return get_changes(db, token)
+    finally:
+        db.close()
+
+def test_write_committed_after_a_token_is_in_the_next_delta(sessions):
+    token = _synced(sessions, None)["token"]
+
+    # Started long before the next token and committed after it
+    writer = sessions()
+    entry_id = _add_entry(writer, updated_at=datetime.utcnow() - timedelta(hours=2))
+    during = _synced(sessions, token)
+    writer.commit()
+    writer.close()
+
+    assert during["reset"] is False and during["time_entries"] == []
+    after = _synced(sessions, during["token"])
+    assert [row["id"] for row in after["time_entries"]] == [entry_id]
+    assert _synced(sessions, after["token"])["time_entries"] == []
+
+def test_deletions_and_reused_ids(sessions):
+    db = sessions()
+    dropped = _add_entry(db)
+    _add_entry(db)
+    reused = _add_entry(db)
+    db.commit()
+    token = _synced(sessions, None)["token"]
+
+    record_change(db, models.TimeEntry)
+    db.execute(models.TimeEntry.__table__.delete().where(models.TimeEntry.id.in_([dropped, reused])))
+    record_tombstone(db, models.TimeEntry, dropped)
+    record_tombstone(db, models.TimeEntry, reused)
+    db.commit()
+    # SQLite hands the highest id out again
+    assert _add_entry(db) == reused
+    db.commit()
+    db.close()
+
+    changes = _synced(sessions, token)
+    assert changes["deleted"] == {"time_entries": [dropped]}
+    assert [row["id"] for row in changes["time_entries"]] == [reused]
+
+def test_stale_tokens_get_a_reset(sessions):
+    clock_token = encode_cursor({"t": datetime.utcnow().isoformat()})
+    assert _synced(sessions, clock_token)["reset"] is True
+
+    db = sessions()
+    db.execute(insert(models.DataVersion.__table__).values(name="employees", version=5))
+    db.commit()
+    db.close()
+    token = _synced(sessions, None)["token"]
+    db = sessions()
+    db.query(models.DataVersion).delete()
+    db.commit()
+    db.close()
+    # Counters behind the token, as after restoring a backup
+    assert _synced(sessions, token)["reset"] is True
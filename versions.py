@@ -0,0 +1,35 @@
+from typing import Dict
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app import models
+from app.writes import dialect_insert
+
+# Change counters kept in the data_versions table. Writers bump them in their
+# own transaction, so a counter changes exactly when the change becomes
+# visible, however close together two writes are, and every worker and
+# replica reads the same value.
+
+def bump_versions(db: Session, *names: str) -> None:
+    """Increment the named counters, creating them at 1. Does not commit.
+
+    The counter rows stay locked until the transaction ends and concurrent
+    writers of the same counter wait there, so keep what follows short.
+    """
+    if not names:
+        return
+    table = models.DataVersion.__table__
+    insert = dialect_insert(db)
+    # Sorted so two transactions always lock the rows in the same order
+    stmt = insert(table).values([{"name": name, "version": 1} for name in sorted(set(names))])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.name],
+        set_={"version": table.c.version + 1}
+    ))
+
+def read_versions(db: Session, *names: str) -> Dict[str, int]:
+    """Current value of the named counters, 0 for one never bumped"""
+    table = models.DataVersion.__table__
+    versions = dict.fromkeys(names, 0)
+    rows = db.execute(select(table.c.name, table.c.version).where(table.c.name.in_(names)))
+    versions.update((name, version) for name, version in rows)
+    return versions
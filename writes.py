@@ -0,0 +1,73 @@
+from typing import Optional, Sequence, Tuple
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+# Single-statement writes: each helper sends one INSERT/UPDATE/DELETE ...
+# RETURNING instead of loading the row, changing it and reading it back.
+# PostgreSQL and SQLite (>= 3.35) both support RETURNING.
+
+def insert_returning(db: Session, model, values: dict) -> Row:
+    """Insert a row and return all its columns, server defaults included"""
+    table = model.__table__
+    return db.execute(insert(table).values(**values).returning(*table.c)).one()
+
+def select_row(
+    db: Session, model, row_id: int, columns: Optional[Sequence[str]] = None, for_update: bool = False
+) -> Optional[Row]:
+    """Columns of a row by id (all by default), optionally locked until the transaction ends"""
+    table = model.__table__
+    selected = table.c if columns is None else [table.c[name] for name in columns]
+    query = select(*selected).where(table.c.id == row_id)
+    if for_update:
+        query = query.with_for_update()
+    return db.execute(query).first()
+
+def update_returning(db: Session, model, row_id: int, values: dict) -> Optional[Row]:
+    """Update a row by id and return all its new columns, or None if it does not exist"""
+    if not values:
+        return select_row(db, model, row_id)
+    table = model.__table__
+    return db.execute(
+        update(table).where(table.c.id == row_id).values(**values).returning(*table.c)
+    ).first()
+
+def delete_returning(db: Session, model, row_id: int, columns: Sequence[str] = ("id",)) -> Optional[Row]:
+    """Delete a row by id and return columns of it, or None if it did not exist"""
+    table = model.__table__
+    return db.execute(
+        delete(table).where(table.c.id == row_id).returning(*(table.c[name] for name in columns))
+    ).first()
+
+def dialect_insert(db: Session):
+    """The dialect's insert(), whose statements support on_conflict_do_update"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    else:
+        raise NotImplementedError(f"Upserts are not supported on {dialect}")
+    return upsert
+
+# SQLSTATE classes of the constraint violations mapped to 4xx responses
+_PG_VIOLATIONS = {"23503": "foreign_key", "23505": "unique", "23514": "check", "23502": "not_null"}
+_SQLITE_VIOLATIONS = {
+    "FOREIGN KEY constraint failed": "foreign_key",
+    "UNIQUE constraint failed": "unique",
+    "CHECK constraint failed": "check",
+    "NOT NULL constraint failed": "not_null",
+}
+
+def constraint_violation(exc: IntegrityError) -> Tuple[Optional[str], Optional[str]]:
+    """(kind, constraint name) of an IntegrityError; the name is only known on PostgreSQL"""
+    code = getattr(exc.orig, "pgcode", None) or getattr(exc.orig, "sqlstate", None)
+    if code is not None:
+        diag = getattr(exc.orig, "diag", None)
+        return _PG_VIOLATIONS.get(code), getattr(diag, "constraint_name", None)
+    message = str(exc.orig)
+    for prefix, kind in _SQLITE_VIOLATIONS.items():
+        if message.startswith(prefix):
+            return kind, None
+    return None, None